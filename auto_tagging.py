@@ -1,10 +1,13 @@
-import spacy
-import yake
 import os
-import pandas as pd
 import re
+import argparse
+from functools import lru_cache
 from collections import Counter
 
+import config
+import metrics
+import model_registry
+
 
 summary_text = (
     """Meeting Summary: Arbitrage Model for Index Basket Trading
@@ -39,8 +42,24 @@ Current Progress:
 )
 
 
-# Load spaCy English model
-nlp = spacy.load("en_core_web_sm")
+# Pipes the tagger never reads (noun chunks need tagger+parser, entities need ner)
+UNUSED_PIPES = ["lemmatizer"]
+
+# Load spaCy English model on first use
+def _load_nlp():
+    import spacy
+    return spacy.load(config.SPACY_MODEL, disable=UNUSED_PIPES)
+
+model_registry.register("spacy", _load_nlp)
+
+def get_nlp():
+    return model_registry.get("spacy")
+
+@lru_cache(maxsize=None)
+def get_keyword_extractor(top):
+    # Built once per size instead of on every call
+    import yake
+    return yake.KeywordExtractor(lan="en", n=3, top=top)
 
 # Define stoplist to exclude generic, cross-topic terms
 stop_tags = {
@@ -48,15 +67,16 @@ stop_tags = {
     "structure", "method", "logic", "discussion", "result", "task", "step", "conclusion", "a"
 }
 
-def generate_general_tags(summary, word_freq, max_tags=4):
-    doc = nlp(summary)
+def generate_general_tags(summary, word_freq, max_tags=4, doc=None, idf=None):
+    if doc is None:
+        doc = get_nlp()(summary)
 
     # Extract candidates
     noun_phrases = [chunk.text.lower().strip() for chunk in doc.noun_chunks]
     named_entities = [ent.text.lower().strip() for ent in doc.ents]
 
     # YAKE keyword extraction
-    kw_extractor = yake.KeywordExtractor(lan="en", n=3, top=max_tags * 5)
+    kw_extractor = get_keyword_extractor(max_tags * 5)
     keywords = [kw[0].lower().strip() for kw in kw_extractor.extract_keywords(summary)]
 
     # Combine and filter
@@ -74,7 +94,8 @@ def generate_general_tags(summary, word_freq, max_tags=4):
         s = 0
         words = tag.split()
         n_words = len(words)
-        tag_freq_score = sum(word_freq.get(word, 0) for word in words)
+        # Within-note frequency, weighted by corpus rarity when idf is available
+        tag_freq_score = sum(word_freq.get(word, 0) * (idf(word) if idf else 1) for word in words)
         s += tag_freq_score
         if n_words >= 3:
             s -= 1
@@ -104,9 +125,11 @@ def generate_general_tags(summary, word_freq, max_tags=4):
     return tags
 
 
-def get_word_frequency(text):
-    doc = nlp(text.lower())
-    word_freq = Counter([token.text for token in doc if token.is_alpha and not token.is_stop])
+def get_word_frequency(text, doc=None):
+    # Reuse a parse of the original text when given; lower_ stands in for re-parsing text.lower()
+    if doc is None:
+        doc = get_nlp()(text.lower())
+    word_freq = Counter([token.lower_ for token in doc if token.is_alpha and not token.is_stop])
     return word_freq
 
 def clean_tag(tag):
@@ -115,7 +138,43 @@ def clean_tag(tag):
     tag = re.sub(r"\s+", " ", tag)         # normalize whitespace
     return tag
 
-# word_freq = get_word_frequency(summary_text)
-tags = generate_general_tags(summary_text, get_word_frequency(summary_text), max_tags=4)
-tags = [clean_tag(tag) for tag in tags]
-print("Generated Tags:" , tags)
+def tags_from_doc(summary, doc, max_tags=4, stats=None):
+    """
+    Tags for a summary from its single spaCy parse (candidates and
+    frequencies). With stats (term_stats.DocumentFrequencies) words are
+    weighted by IDF over the stored notes, so corpus-wide generic terms lose.
+    """
+    word_freq = get_word_frequency(summary, doc=doc)
+    idf = stats.idf if stats is not None else None
+    tags = generate_general_tags(summary, word_freq, max_tags=max_tags, doc=doc, idf=idf)
+    return [clean_tag(tag) for tag in tags]
+
+@metrics.timed("tagging.extract_tags")
+def extract_tags(summary, max_tags=4, stats=None):
+    return tags_from_doc(summary, get_nlp()(summary), max_tags=max_tags, stats=stats)
+
+@metrics.timed("tagging.tag_many")
+def tag_many(summaries, n_process=1, batch_size=64, max_tags=4, stats=None):
+    """
+    Tag many summaries with nlp.pipe, which batches the parser and can fan
+    out to n_process worker processes. Returns one tag list per summary.
+    """
+    summaries = list(summaries)
+    docs = get_nlp().pipe(summaries, n_process=n_process, batch_size=batch_size)
+    return [tags_from_doc(summary, doc, max_tags=max_tags, stats=stats)
+            for summary, doc in zip(summaries, docs)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate tags for a summary or backfill the note store.")
+    parser.add_argument("--backfill", action="store_true", help="re-tag every note in the store")
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.backfill:
+        from db import backfill_tags
+        backfill_tags(n_process=args.n_process, batch_size=args.batch_size)
+    else:
+        # word_freq = get_word_frequency(summary_text)
+        tags = extract_tags(summary_text, max_tags=4)
+        print("Generated Tags:" , tags)
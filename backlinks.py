@@ -1,45 +1,40 @@
-from sentence_transformers import util
-import torch
-import json
-
-with open("db.json", "r") as f:
-    notes = json.load(f)
-
-note_embeddings = []
-note_ids = []
-
-for note in notes:
-    if "embedding" in note and note["embedding"]:
-        note_embeddings.append(torch.tensor(note["embedding"]))
-        note_ids.append(note["id"])
-
-for i, note in enumerate(notes):
-    if not note.get("embedding"):
-        continue  # skip if no embedding
-
-    current_id = note["id"]
-    current_emb = torch.tensor(note["embedding"]).unsqueeze(0)  # shape: (1, dim)
-    print("Current ID:", current_id)
-    # Compare with all other embeddings
-    others = torch.stack([
-        emb for j, emb in enumerate(note_embeddings) if j != i 
-    ])
-    other_ids = [note_ids[j] for j in range(len(note_ids)) if j != i ]
-
-    similarities = util.cos_sim(current_emb, others).squeeze(0)  # shape: (N,)
-    print(similarities)
-    top_matches = [
-        (other_ids[j], similarities[j].item())
-        for j in range(len(other_ids)) if similarities[j] >= 0.65
-    ]
-    print("Top matches:", top_matches)
-
-    # Sort and keep top 3
-    top_matches.sort(key=lambda x: x[1], reverse=True)
-    backlinks = [match[0] for match in top_matches[:3]]
-
-    # Update backlinks field
-    note["backlinks"] = backlinks
-    
-with open("db.json", "w") as f:
-    json.dump(notes, f, indent=4)
+import config
+import metrics
+from db import get_store, get_index
+
+
+def rebuild_backlinks(store, index, limit=None, verbose=False):
+    """
+    Recompute every note's backlinks (its top-k neighbours above the
+    threshold) from the index. Returns {note id: {"backlinks": [...]}} for
+    the notes whose links changed; limit stops after that many notes.
+    """
+    changes = {}
+    with metrics.timer("backlinks.rebuild"):
+        for i, note in enumerate(store.iter_notes(with_embeddings=True)):
+            if limit is not None and i >= limit:
+                break
+            current_id = note["id"]
+            if verbose:
+                print("Current ID:", current_id)
+
+            # Top-k other notes above the similarity threshold, best first
+            with metrics.timer("backlinks.search"):
+                top_matches = index.search(note["embedding"], k=config.BACKLINK_TOP_K,
+                                           min_score=config.BACKLINK_THRESHOLD, exclude={current_id})
+            if verbose:
+                print("Top matches:", top_matches)
+
+            # Update backlinks field
+            backlinks = [match[0] for match in top_matches]
+            if backlinks != note.get("backlinks"):
+                changes[current_id] = {"backlinks": backlinks}
+    metrics.inc("backlinks.changed", len(changes))
+    return changes
+
+
+if __name__ == "__main__":
+    store = get_store()
+    changes = rebuild_backlinks(store, get_index(), verbose=True)
+    if changes:
+        store.update_many(changes)
@@ -0,0 +1,41 @@
+"""
+Embedding throughput (notes/sec) of generate_embeddings on CPU at several
+batch sizes. Needs sentence-transformers and the all-MiniLM-L6-v2 weights.
+
+    python benchmarks/bench_embedding.py [--notes 512] [--batch-sizes 1 8 32 128]
+"""
+import os
+import json
+import time
+import argparse
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")  # CPU numbers only
+os.environ.setdefault("NEURON_EMBEDDING_CACHE", "0")  # measure the model, not the cache
+
+from common import ROOT
+
+
+def sample_texts(n):
+    # Cycle the bundled summaries, varied so no two inputs are identical
+    with open(os.path.join(ROOT, "db.json"), "r") as f:
+        summaries = [note["text"] for note in json.load(f)]
+    return [f"{summaries[i % len(summaries)]}\nNote {i}" for i in range(n)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    from vector_embedding import generate_embeddings
+
+    texts = sample_texts(args.notes)
+    generate_embeddings(texts[:8], batch_size=8)  # warm up kernels
+
+    print(f"{'batch':>6} {'seconds':>9} {'notes/sec':>10}")
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        generate_embeddings(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size:6d} {elapsed:9.2f} {len(texts) / elapsed:10.1f}")
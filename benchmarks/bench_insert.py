@@ -0,0 +1,68 @@
+"""
+Insert latency of the journaled NoteStore against the old full-file
+rewrite of db.json, as the corpus grows from 10 to 100k notes.
+
+    python benchmarks/bench_insert.py [--sizes 10 100 1000 10000 100000]
+"""
+import json
+import argparse
+import tempfile
+
+from common import random_embeddings, synthetic_notes, time_calls, percentile
+from note_store import NoteStore
+
+
+def bench_store(size, inserts, fsync):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(tmp, fsync=fsync)
+        store.extend(synthetic_notes(size), random_embeddings(size))
+        store.compact()
+
+        vectors = random_embeddings(inserts, seed=1)
+        notes = iter(synthetic_notes(inserts, start=size))
+        rows = iter(vectors)
+        latencies = time_calls(lambda: store.append(next(notes), next(rows)), inserts)
+        store.close()
+    return latencies
+
+
+def bench_legacy(size, inserts):
+    # The pre-store db.py: load everything, append, json.dump(indent=4) everything
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/db.json"
+        data = synthetic_notes(size)
+        for note, vector in zip(data, random_embeddings(size)):
+            note["embedding"] = vector.tolist()
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+
+        vectors = random_embeddings(inserts, seed=1)
+        notes = iter(synthetic_notes(inserts, start=size))
+        rows = iter(vectors)
+
+        def insert():
+            with open(path, "r") as f:
+                db = json.load(f)
+            db.append(dict(next(notes), embedding=next(rows).tolist()))
+            with open(path, "w") as f:
+                json.dump(db, f, indent=4)
+
+        return time_calls(insert, inserts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--inserts", type=int, default=500)
+    parser.add_argument("--legacy-max", type=int, default=1000,
+                        help="skip the db.json rewrite above this size (it is O(N) per insert)")
+    parser.add_argument("--no-fsync", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'notes':>8} {'store p50 ms':>13} {'store p99 ms':>13} {'db.json p50 ms':>15}")
+    for size in args.sizes:
+        store = bench_store(size, args.inserts, fsync=not args.no_fsync)
+        legacy = ""
+        if size <= args.legacy_max:
+            legacy = f"{percentile(bench_legacy(size, 5), 50):15.2f}"
+        print(f"{size:8d} {percentile(store, 50):13.3f} {percentile(store, 99):13.3f} {legacy}")
@@ -0,0 +1,67 @@
+"""
+Quantized indexes (int8, product quantization) against exact float32
+search: recall@10 of the exact top 10, index RAM per vector, and query
+latency, with and without float re-ranking from the note store.
+
+    python benchmarks/bench_quantization.py [--sizes 10000 100000] [--queries 200]
+"""
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from common import clustered_embeddings, synthetic_notes, percentile
+from note_store import NoteStore
+from vector_index import BruteForceIndex, Int8Index, PQIndex
+
+
+def recall_at(k, exact, found):
+    return np.mean([len(set(e[:k]) & set(f[:k])) / k for e, f in zip(exact, found)])
+
+
+def bench_size(size, n_queries, tmp):
+    vectors = clustered_embeddings(size + n_queries, seed=size)
+    queries, vectors = vectors[:n_queries], vectors[n_queries:]
+    notes = synthetic_notes(size)
+    ids = [note["id"] for note in notes]
+    store = NoteStore(f"{tmp}/store_{size}", compact_every=0, fsync=False)
+    store.extend(notes, vectors)
+
+    variants = [
+        ("float32 exact", lambda: BruteForceIndex(store.dim)),
+        ("int8", lambda: Int8Index(store.dim, rerank=1)),
+        ("int8 + rerank", lambda: Int8Index(store.dim, store=store)),
+        ("pq48", lambda: PQIndex(store.dim, rerank=1)),
+        ("pq48 + rerank", lambda: PQIndex(store.dim, store=store)),
+        ("pq24 + rerank", lambda: PQIndex(store.dim, store=store, subspaces=24)),
+    ]
+    print(f"\n{size} vectors, {n_queries} queries")
+    print(f"{'index':>16} {'build s':>8} {'B/vector':>9} {'recall@10':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    exact = None
+    for name, make in variants:
+        start = time.perf_counter()
+        index = make()
+        index.add(ids, store.embeddings)
+        build = time.perf_counter() - start
+
+        found, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            found.append([note_id for note_id, _ in index.search(query, k=10)])
+            latencies.append(time.perf_counter() - start)
+        if exact is None:
+            exact = found
+        print(f"{name:>16} {build:8.2f} {index.memory_bytes() / size:9.1f} {recall_at(10, exact, found):10.3f} "
+              f"{percentile(latencies, 50) * 1000:8.2f} {percentile(latencies, 99) * 1000:8.2f}")
+    store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            bench_size(size, args.queries, tmp)
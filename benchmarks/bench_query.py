@@ -0,0 +1,64 @@
+"""
+Filtered note queries through the inverted index against a linear scan of
+every note record (what answering them took before), at 10k and 100k notes.
+
+    python benchmarks/bench_query.py [--sizes 10000 100000]
+"""
+import time
+import argparse
+
+from common import synthetic_corpus, time_calls, percentile
+from inverted_index import InvertedIndex
+from term_stats import tokenize
+
+
+QUERIES = {
+    "tag AND tag": dict(all_tags=["basket", "latency"]),
+    "tag OR tag": dict(any_tags=["compliance", "churn", "term40"]),
+    "text terms": dict(terms=["slippage", "retraining"]),
+    "prefix": dict(prefix="term12"),
+    "tag + terms": dict(all_tags=["index"], terms=["pricing"]),
+}
+
+
+def linear_scan(notes, all_tags=(), any_tags=(), terms=(), prefix=None, page=0, page_size=20):
+    hits = []
+    for note in reversed(notes):
+        tags = set(note["tags"])
+        if not all(t in tags for t in all_tags):
+            continue
+        if any_tags and not tags.intersection(any_tags):
+            continue
+        words = set(tokenize(note["text"]))
+        if not all(t in words for t in terms):
+            continue
+        if prefix and not any(w.startswith(prefix) for w in words | tags):
+            continue
+        hits.append(note["id"])
+    return len(hits), hits[page * page_size:(page + 1) * page_size]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scan-repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        notes = synthetic_corpus(size)
+        start = time.perf_counter()
+        index = InvertedIndex()
+        for note in notes:
+            index.add(note["id"], note["text"], note["tags"])
+        print(f"\n{size} notes, index built in {time.perf_counter() - start:.1f}s")
+        print(f"{'query':>14} {'hits':>7} {'index p50 ms':>13} {'index p99 ms':>13} {'scan p50 ms':>12}")
+
+        for name, query in QUERIES.items():
+            total, ids = index.query(**query)
+            expected = linear_scan(notes, **query)
+            assert (total, ids) == expected, name
+            fast = time_calls(lambda: index.query(**query), args.repeat)
+            slow = time_calls(lambda: linear_scan(notes, **query), args.scan_repeat)
+            print(f"{name:>14} {total:7d} {percentile(fast, 50):13.3f} {percentile(fast, 99):13.3f} "
+                  f"{percentile(slow, 50):12.1f}")
@@ -0,0 +1,63 @@
+"""
+Hybrid search latency (p50/p99) over synthetic stores of 10k and 100k notes,
+with and without a tag filter. The embedding model is stubbed so the numbers
+cover retrieval and fusion only.
+
+    python benchmarks/bench_search.py [--sizes 10000 100000] [--index brute|ivf|int8|pq|hnsw]
+"""
+import os
+import time
+import argparse
+import tempfile
+
+from common import QUERIES, synthetic_corpus, use_stub_models, StubEmbedder, time_calls, percentile
+
+
+def bench_size(size, repeat, tmp):
+    import config
+    import db
+    from note_store import NoteStore
+    from search import hybrid_search
+
+    path = os.path.join(tmp, f"store_{size}")
+    notes = synthetic_corpus(size)
+    store = NoteStore(path, compact_every=0, fsync=False)
+    embedder = StubEmbedder()
+    for start in range(0, size, 10000):
+        chunk = notes[start:start + 10000]
+        store.extend(chunk, embedder.encode([n["text"] for n in chunk]))
+
+    store.close()
+    db.reset(path)
+    db.get_store()
+    start = time.perf_counter()
+    db.get_index()
+    db.get_inverted_index()
+    print(f"\n{size} notes ({config.INDEX_TYPE} index), indexes built in {time.perf_counter() - start:.1f}s")
+    print(f"{'query':>40} {'p50 ms':>8} {'p99 ms':>8}")
+
+    results = {}
+    for text, filters in QUERIES:
+        hybrid_search(text, **filters)  # warm
+        latencies = time_calls(lambda: hybrid_search(text, k=10, **filters), repeat)
+        label = text + (f" {filters}" if filters else "")
+        results[label] = {"p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99)}
+        print(f"{label[:40]:>40} {percentile(latencies, 50):8.2f} {percentile(latencies, 99):8.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--index", default=None, help="override config.INDEX_TYPE")
+    args = parser.parse_args()
+
+    use_stub_models()
+    import config
+    if args.index:
+        config.INDEX_TYPE = args.index
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            bench_size(size, args.repeat, tmp)
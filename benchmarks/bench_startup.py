@@ -0,0 +1,64 @@
+"""
+Startup cost of `import db` + `load_db()` in a fresh interpreter, with models
+loaded lazily (current behaviour) and eagerly (forcing the embedding model
+load the way the module import used to).
+
+    python benchmarks/bench_startup.py [--notes 1000] [--runs 5]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+
+from common import ROOT, random_embeddings, synthetic_notes, percentile
+from note_store import NoteStore
+
+
+LAZY = "import db; db.load_db()"
+EAGER = "import db; db.load_db(); import vector_embedding; vector_embedding.get_model()"
+
+SNIPPET = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def run(code, env, cwd):
+    out = subprocess.run([sys.executable, "-c", SNIPPET.format(code=code)], env=env, cwd=cwd,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return None, out.stderr.strip().splitlines()[-1]
+    return float(out.stdout.strip().splitlines()[-1]), None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(os.path.join(tmp, "store"))
+        store.extend(synthetic_notes(args.notes), random_embeddings(args.notes))
+        store.close()
+
+        env = dict(os.environ, PYTHONPATH=ROOT, NEURON_STORE_DIR=os.path.join(tmp, "store"),
+                   NEURON_DB_FILE=os.path.join(tmp, "db.json"))
+        results = {}
+        for name, code in (("lazy (import db + load_db)", LAZY), ("eager (+ embedding model)", EAGER)):
+            times = []
+            for _ in range(args.runs):
+                seconds, error = run(code, env, tmp)
+                if error:
+                    print(f"{name}: failed ({error})")
+                    break
+                times.append(seconds)
+            if times:
+                results[name] = times
+                print(f"{name}: median {percentile(times, 50):.3f}s over {len(times)} runs")
+
+        print(json.dumps({name: percentile(t, 50) for name, t in results.items()}))
@@ -0,0 +1,273 @@
+"""
+End-to-end benchmark suite over synthetic corpora (1k, 10k and 100k notes by
+default): store load and index builds, single and bulk inserts, a full
+backlink rebuild, tag extraction, search, and the legacy db.json export.
+
+Everything is reproducible and offline: notes come from synthetic_corpus,
+embeddings from clustered_embeddings (one topic per ~50 notes, so backlink
+thresholds are crossed about as often as with real summaries), and the
+embedding model, spaCy, YAKE and the summarizer are stubbed. Results go to
+one JSON file per run; --compare checks them against an earlier file and
+exits non-zero on regressions.
+
+    python benchmarks/bench_suite.py [--sizes 1000 10000 100000] [--out results.json]
+    python benchmarks/bench_suite.py --sizes 1000 10000 --compare benchmarks/results/baseline.json
+"""
+import io
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+import numpy as np
+
+from common import ROOT, QUERIES, synthetic_corpus, clustered_embeddings, use_stub_models, time_calls, percentile
+
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+LISTINGS = [
+    dict(all_tags=["basket"]),
+    dict(any_tags=["compliance", "churn"]),
+    dict(terms=["slippage", "retraining"]),
+    dict(prefix="term12"),
+]
+
+# Changes smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.05
+
+
+def corpus(size, extra, seed):
+    """size notes plus `extra` held-out (text, tags, embedding) for inserts, all from one topic model."""
+    notes = synthetic_corpus(size + extra, seed=seed)
+    vectors = clustered_embeddings(size + extra, topics=max(20, (size + extra) // 50), spread=0.8, seed=seed)
+    return notes[:size], vectors[:size], notes[size:], vectors[size:]
+
+
+def write_store(path, notes, vectors):
+    from note_store import NoteStore
+    store = NoteStore(path, compact_every=0, fsync=False)
+    for start in range(0, len(notes), 10000):
+        store.extend(notes[start:start + 10000], vectors[start:start + 10000])
+    store.compact()
+    store.close()
+
+
+def seconds(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def latency(samples):
+    return {"p50_ms": percentile(samples, 50), "p99_ms": percentile(samples, 99)}
+
+
+def bench_load(path):
+    import db
+    db.reset(path)
+    return {
+        "store_open_s": seconds(db.get_store),
+        "load_db_s": seconds(db.load_db),
+        "index_build_s": seconds(db.get_index),
+        "inverted_build_s": seconds(db.get_inverted_index),
+        "term_stats_s": seconds(db.get_term_stats),
+    }
+
+
+def bench_search(repeat):
+    import db
+    from search import hybrid_search, semantic_search
+
+    for text, filters in QUERIES:
+        hybrid_search(text, **filters)  # warm the stub embedder's table and the caches
+    hybrid = [ms for text, filters in QUERIES
+              for ms in time_calls(lambda: hybrid_search(text, k=10, **filters), repeat)]
+    semantic = [ms for text, _ in QUERIES for ms in time_calls(lambda: semantic_search(text, k=10), repeat)]
+    listing = [ms for query in LISTINGS for ms in time_calls(lambda: db.query_notes(**query), repeat)]
+    return {"hybrid": latency(hybrid), "semantic": latency(semantic), "filtered_listing": latency(listing)}
+
+
+def bench_tagging(notes, sample):
+    import auto_tagging
+    import db
+    texts = [note["text"] for note in notes[:sample]]
+    stats = db.get_term_stats()
+    auto_tagging.extract_tags(texts[0], stats=stats)
+    single = [ms for text in texts for ms in time_calls(lambda: auto_tagging.extract_tags(text, stats=stats), 1)]
+    batched = seconds(lambda: auto_tagging.tag_many(texts, stats=stats))
+    return {"notes": len(texts), "extract_tags": latency(single), "tag_many_per_sec": len(texts) / batched}
+
+
+def bench_insert(notes, vectors):
+    import db
+    half = len(notes) // 2
+    single = iter(zip(notes[:half], vectors[:half]))
+
+    def insert():
+        note, vector = next(single)
+        db.add_note(note["text"], tags=note["tags"], embedding=vector)
+
+    bulk = notes[half:]
+    with redirect_stdout(io.StringIO()):  # add_note reports every note
+        latencies = time_calls(insert, half)
+        bulk_s = seconds(lambda: db.add_notes([n["text"] for n in bulk], tags=[n["tags"] for n in bulk]))
+    return {"add_note": latency(latencies), "add_notes_per_sec": len(bulk) / bulk_s}
+
+
+def bench_backlinks(sample):
+    from backlinks import rebuild_backlinks
+    import db
+    store, index = db.get_store(), db.get_index()
+    limit = min(sample, len(store))
+    changes = {}
+    elapsed = seconds(lambda: changes.update(rebuild_backlinks(store, index, limit=limit)))
+    apply_s = seconds(lambda: store.update_many(changes)) if changes else 0.0
+    per_note_ms = elapsed * 1000 / limit
+    return {"notes": limit, "sampled": limit < len(store), "per_note_ms": per_note_ms,
+            "full_rebuild_s": per_note_ms * len(store) / 1000, "changed": len(changes), "apply_s": apply_s}
+
+
+def bench_export(tmp):
+    import db
+    path = os.path.join(tmp, "db.json")
+    elapsed = seconds(lambda: db.export_db(path))
+    return {"export_s": elapsed, "bytes": os.path.getsize(path)}
+
+
+def bench_size(size, args, tmp):
+    import db
+    notes, vectors, new_notes, new_vectors = corpus(size, args.inserts, args.seed)
+    path = os.path.join(tmp, f"store_{size}")
+    result = {"notes": size, "write_s": seconds(lambda: write_store(path, notes, vectors))}
+    gc.collect()
+
+    # Search and tagging before inserting, so they see exactly `size` notes
+    result["load"] = bench_load(path)
+    result["search"] = bench_search(args.repeat)
+    result["tagging"] = bench_tagging(notes, args.tag_sample)
+    result["insert"] = bench_insert(new_notes, new_vectors)
+    result["backlinks"] = bench_backlinks(args.rebuild_sample)
+    result["export"] = bench_export(tmp)
+    db.close()
+    return result
+
+
+def environment(args):
+    import config
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "index_type": config.INDEX_TYPE,
+        "embedding_dim": config.EMBEDDING_DIM,
+        "backlink_threshold": config.BACKLINK_THRESHOLD,
+        "backlink_top_k": config.BACKLINK_TOP_K,
+        "fsync": config.JOURNAL_FSYNC,
+        "args": vars(args),
+    }
+
+
+def flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    """Print timings that moved by more than threshold (a ratio); returns the regressions."""
+    current, before = flatten(results["sizes"]), flatten(baseline["sizes"])
+    regressions = []
+    print(f"\n{'metric':>44} {'baseline':>11} {'current':>11} {'ratio':>7}")
+    for name in sorted(current.keys() & before.keys()):
+        if name.endswith(("_ms", "_s")):
+            scale = 1000 if name.endswith("_s") else 1
+            if abs(current[name] - before[name]) * scale < NOISE_FLOOR_MS:
+                continue
+            ratio = current[name] / before[name] if before[name] else float("inf")
+        elif name.endswith("_per_sec"):
+            ratio = before[name] / current[name] if current[name] else float("inf")
+        else:
+            continue
+        if ratio > threshold or ratio < 1 / threshold:
+            flag = "REGRESSION" if ratio > threshold else "faster"
+            print(f"{name:>44} {before[name]:11.4g} {current[name]:11.4g} {ratio:7.2f} {flag}")
+            if ratio > threshold:
+                regressions.append(name)
+    print(f"{len(regressions)} regression(s) beyond {threshold:.2f}x")
+    return regressions
+
+
+def summary_line(size, r):
+    return (f"{size:>7} notes: load {r['load']['store_open_s'] + r['load']['index_build_s']:.2f}s, "
+            f"add_note p50 {r['insert']['add_note']['p50_ms']:.2f}ms, "
+            f"rebuild {r['backlinks']['full_rebuild_s']:.1f}s{'*' if r['backlinks']['sampled'] else ''}, "
+            f"tags p50 {r['tagging']['extract_tags']['p50_ms']:.2f}ms, "
+            f"hybrid p50 {r['search']['hybrid']['p50_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark load, insert, backlinks, tagging and search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per search query")
+    parser.add_argument("--inserts", type=int, default=200, help="held-out notes to insert (half one by one)")
+    parser.add_argument("--tag-sample", type=int, default=300)
+    parser.add_argument("--rebuild-sample", type=int, default=1000,
+                        help="notes to run the backlink rebuild over; the full time is extrapolated")
+    parser.add_argument("--index", default=None, help="override config.INDEX_TYPE")
+    parser.add_argument("--fsync", action="store_true", help="fsync journal appends, as in production")
+    parser.add_argument("--out", help=f"results file (default: {RESULTS_DIR}/<time>-<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to check against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args()
+
+    # Before config is first imported; NoteStore reads it for its defaults
+    os.environ["NEURON_JOURNAL_FSYNC"] = "1" if args.fsync else "0"
+    use_stub_models()
+    import config
+    if args.index:
+        config.INDEX_TYPE = args.index
+
+    results = {"environment": environment(args), "sizes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results["sizes"][str(size)] = bench_size(size, args, tmp)
+            print(summary_line(size, results["sizes"][str(size)]), flush=True)
+    print("(* extrapolated from --rebuild-sample notes)")
+
+    out = args.out
+    if out is None:
+        env = results["environment"]
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = os.path.join(RESULTS_DIR, f"{stamp}-{env['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,95 @@
+"""
+Single-prompt vs map-reduce (hierarchical) summarization of long synthetic
+meeting transcripts: wall time and coverage, the share of the meeting's
+topics whose key terms survive into the final notes.
+
+By default the summarization backend is the offline stub with a 2048-token
+context (the single prompt loses whatever does not fit, as a real model
+would) and per-token delays standing in for generation cost. Pass
+--backend ollama or transformers to measure a real model.
+
+    python benchmarks/bench_summarize.py [--words 2000 8000 32000] [--backend stub]
+"""
+import time
+import argparse
+
+import numpy as np
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+import config
+import model_registry
+from summarization import SummaryService, StubBackend, make_backend
+
+
+FILLER = ("so yeah okay right like um basically I think we should you know maybe "
+          "that makes sense and then also the thing is").split()
+
+TOPICS = [
+    ("arbitrage", "basket", "convergence"), ("sentiment", "ticket", "classifier"),
+    ("roadmap", "onboarding", "prioritization"), ("deployment", "rollout", "staging"),
+    ("monitoring", "alerting", "postmortem"), ("compliance", "audit", "retention"),
+    ("budget", "forecast", "hiring"), ("embedding", "backlink", "graph"),
+    ("calendar", "reminder", "recording"), ("churn", "conversion", "dashboard"),
+    ("latency", "caching", "profiling"), ("schema", "migration", "backfill"),
+    ("pricing", "discount", "renewal"), ("accessibility", "localization", "fonts"),
+    ("security", "tokens", "rotation"), ("backtest", "slippage", "liquidity"),
+]
+
+
+def synthetic_transcript(n_words, words_per_topic=400, seed=0):
+    """Spoken-style transcript: consecutive topic segments, key terms mixed with filler."""
+    rng = np.random.default_rng(seed)
+    words, topics = [], []
+    while len(words) < n_words:
+        topic = TOPICS[len(topics) % len(TOPICS)]
+        topics.append(topic)
+        for i in range(words_per_topic):
+            words.append(str(rng.choice(topic)) if rng.random() < 0.12 else str(rng.choice(FILLER)))
+            if i % 18 == 17:
+                words[-1] += "."
+    return " ".join(words[:n_words]), topics
+
+
+def coverage(notes, topics):
+    text = notes.lower()
+    distinct = {topic for topic in topics}
+    return sum(any(term in text for term in topic) for topic in distinct) / len(distinct)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, nargs="+", default=[2000, 8000, 32000])
+    parser.add_argument("--backend", default="stub")
+    parser.add_argument("--context", type=int, default=2048, help="stub context window in tokens")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="stub seconds per output word")
+    parser.add_argument("--prefill-delay", type=float, default=0.0002, help="stub seconds per prompt token")
+    args = parser.parse_args()
+
+    if args.backend == "stub":
+        backend = StubBackend(token_delay=args.token_delay, prefill_delay=args.prefill_delay,
+                              context_tokens=args.context)
+    else:
+        backend = make_backend(args.backend)
+    model_registry.register("summarizer", lambda: SummaryService(backend))
+
+    from llama_summarizer import PROMPT_TEMPLATE, summarize_hierarchical, chunk_transcript
+    from summarization import get_service
+    service = get_service()
+
+    print(f"backend={args.backend} chunk={config.SUMMARY_CHUNK_TOKENS} overlap={config.SUMMARY_CHUNK_OVERLAP} "
+          f"concurrency={config.SUMMARY_CONCURRENCY} batch={config.SUMMARY_BATCH_SIZE}")
+    print(f"{'words':>7} {'chunks':>7} {'single s':>9} {'single cov':>11} {'map-reduce s':>13} {'mr cov':>7}")
+    for n_words in args.words:
+        transcript, topics = synthetic_transcript(n_words)
+        chunks = chunk_transcript(transcript, count_tokens=backend.count_tokens)
+
+        start = time.perf_counter()
+        single = service.generate(PROMPT_TEMPLATE.format(transcript=transcript))
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hierarchical = summarize_hierarchical(transcript)
+        mr_s = time.perf_counter() - start
+
+        print(f"{n_words:7d} {len(chunks):7d} {single_s:9.2f} {coverage(single, topics):11.2f} "
+              f"{mr_s:13.2f} {coverage(hierarchical, topics):7.2f}")
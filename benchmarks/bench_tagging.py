@@ -0,0 +1,52 @@
+"""
+Tagging throughput (tags/sec, one tag list per summary) for the old
+two-parse path, the single-parse extract_tags and batched tag_many.
+Needs spaCy with en_core_web_sm and yake.
+
+    python benchmarks/bench_tagging.py [--notes 200] [--n-process 1 2]
+"""
+import os
+import json
+import time
+import argparse
+
+from common import ROOT
+
+
+def sample_summaries(n):
+    with open(os.path.join(ROOT, "db.json"), "r") as f:
+        summaries = [note["text"] for note in json.load(f)]
+    return [f"{summaries[i % len(summaries)]}\nFollow-up item {i}." for i in range(n)]
+
+
+def rate(label, n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>32} {elapsed:8.2f}s {n / elapsed:10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1, 2])
+    args = parser.parse_args()
+
+    import auto_tagging
+
+    summaries = sample_summaries(args.notes)
+    auto_tagging.extract_tags(summaries[0])  # model load and YAKE setup out of the timings
+
+    def two_parse():
+        # Pre-refactor behaviour: one parse for frequencies, another for candidates
+        for summary in summaries:
+            auto_tagging.generate_general_tags(summary, auto_tagging.get_word_frequency(summary))
+
+    print(f"{'mode':>32} {'time':>9} {'tags/sec':>10}")
+    rate("two parses per note (old)", len(summaries), two_parse)
+    rate("extract_tags (single parse)", len(summaries),
+         lambda: [auto_tagging.extract_tags(s) for s in summaries])
+    for n_process in args.n_process:
+        rate(f"tag_many n_process={n_process}", len(summaries),
+             lambda: auto_tagging.tag_many(summaries, n_process=n_process, batch_size=args.batch_size))
@@ -0,0 +1,47 @@
+"""
+Streaming vs whole-file Whisper transcription on the bundled meeting
+recording: time to first segment, real-time factor (wall seconds per audio
+second, lower is faster) and the word error rate of the stitched stream
+against the whole-file transcript as a regression check.
+
+    python benchmarks/bench_transcribe.py [--audio audio-meeting.mp3] [--window 30 --overlap 5]
+"""
+import os
+import time
+import argparse
+
+from common import ROOT
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", default=os.path.join(ROOT, "audio-meeting.mp3"))
+    parser.add_argument("--window", type=float, default=30.0)
+    parser.add_argument("--overlap", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from jiwer import wer
+    import transcribe_audio
+
+    duration = transcribe_audio.audio_duration(args.audio)
+    transcribe_audio.get_model()  # keep the model load out of both timings
+
+    start = time.perf_counter()
+    whole = transcribe_audio.transcribe(args.audio)
+    whole_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_segment = None
+    segments = []
+    for segment in transcribe_audio.transcribe_stream(args.audio, args.window, args.overlap):
+        if first_segment is None:
+            first_segment = time.perf_counter() - start
+        segments.append(segment)
+    stream_seconds = time.perf_counter() - start
+    streamed = " ".join(s["text"] for s in segments)
+
+    print(f"audio: {duration:.1f}s, {len(segments)} streamed segments")
+    print(f"{'mode':>8} {'first text s':>13} {'total s':>9} {'RTF':>7}")
+    print(f"{'whole':>8} {whole_seconds:13.2f} {whole_seconds:9.2f} {whole_seconds / duration:7.3f}")
+    print(f"{'stream':>8} {first_segment or 0:13.2f} {stream_seconds:9.2f} {stream_seconds / duration:7.3f}")
+    print(f"stream vs whole-file WER: {wer(whole.lower(), streamed.lower()):.2%}")
@@ -0,0 +1,216 @@
+import os
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+# Benchmarks run as scripts from the repo root or this folder
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def random_embeddings(n, dim=384, seed=0):
+    """Unit-norm float32 vectors standing in for model output."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def clustered_embeddings(n, dim=384, topics=200, spread=1.0, latent=64, seed=0):
+    """
+    Unit-norm vectors drawn around `topics` random topic directions, with
+    most of the within-topic variation in a `latent`-dimensional subspace.
+    Closer to sentence-embedding geometry (notes on a topic are near each
+    other, the spectrum is far from flat) than isotropic noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = random_embeddings(topics, dim, seed + 1)
+    basis = random_embeddings(latent, dim, seed + 2)
+    vectors = centers[rng.integers(topics, size=n)]
+    vectors = vectors + spread * (rng.standard_normal((n, latent)).astype(np.float32) @ basis) / np.sqrt(latent)
+    vectors = vectors + 0.2 * spread * rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def synthetic_notes(n, start=0):
+    return [
+        {"id": f"summary_{start + i:07d}", "text": f"Meeting Summary: synthetic note {start + i}",
+         "tags": [], "backlinks": []}
+        for i in range(n)
+    ]
+
+
+# Topic words for synthetic note text and tags
+VOCABULARY = (
+    "arbitrage basket index liquidity latency slippage backtest portfolio pricing convergence "
+    "sentiment ticket classifier routing retraining accuracy inference feedback escalation "
+    "roadmap onboarding engagement conversion feature prioritization stakeholder resourcing "
+    "deployment monitoring alerting compliance audit staging rollout migration schema "
+    "embedding transcript summary calendar reminder recording tagging search graph backlink "
+    "budget hiring forecast revenue churn pipeline dashboard metrics incident postmortem"
+).split()
+
+
+# Hybrid search workload shared by bench_search.py and bench_suite.py: (query text, tag filters)
+QUERIES = [
+    ("arbitrage basket convergence", {}),
+    ("customer sentiment ticket routing", {}),
+    ("deployment monitoring incident", {"tags": ["monitoring"]}),
+    ("roadmap feature prioritization", {"any_tags": ["roadmap", "onboarding"]}),
+]
+
+
+def synthetic_corpus(n, start=0, words_per_note=120, tags_per_note=4, seed=0):
+    """
+    Notes with Zipf-distributed topic words and tags drawn from their own
+    text, so postings have realistic skew (a few very common terms, a long
+    tail of rare ones).
+    """
+    rng = np.random.default_rng(seed)
+    vocab = VOCABULARY + [f"term{i}" for i in range(5000)]
+    ranks = np.arange(1, len(vocab) + 1)
+    weights = 1.0 / ranks
+    weights /= weights.sum()
+    notes = []
+    for i in range(n):
+        words = rng.choice(len(vocab), size=words_per_note, p=weights)
+        text = "Meeting Summary: " + " ".join(vocab[w] for w in words)
+        tags = sorted({vocab[w] for w in rng.choice(words[:40], size=tags_per_note)})
+        notes.append({"id": f"summary_{start + i:07d}", "text": text, "tags": tags, "backlinks": []})
+    return notes
+
+
+class StubEmbedder:
+    """
+    Offline stand-in for SentenceTransformer: each word maps (by CRC32) to a
+    fixed random vector and a text embeds as the normalized sum of its
+    words, so texts that share words are close, like real embeddings.
+    """
+
+    def __init__(self, dim=384, buckets=1 << 15, seed=0):
+        self.dim = dim
+        self.table = random_embeddings(buckets, dim, seed)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True,
+               show_progress_bar=False):
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            rows = [zlib.crc32(w.encode()) % len(self.table) for w in text.lower().split()] or [0]
+            out[i] = self.table[rows].sum(axis=0)
+        if normalize_embeddings:
+            out /= np.linalg.norm(out, axis=1, keepdims=True)
+        return out
+
+
+STOP_WORDS = frozenset(
+    "a an the and or but of to in on at for with by from as is are was were be been it this that "
+    "we you they he she i our their its not no so if then than there here have has had do does did "
+    "will would can could should about into over after before up down out when what which who how".split()
+)
+
+
+class _Token:
+    __slots__ = ("text", "lower_", "is_alpha", "is_stop")
+
+    def __init__(self, text):
+        self.text = text
+        self.lower_ = text.lower()
+        self.is_alpha = text.isalpha()
+        self.is_stop = self.lower_ in STOP_WORDS
+
+
+class _Span:
+    __slots__ = ("text",)
+
+    def __init__(self, tokens):
+        self.text = " ".join(token.text for token in tokens)
+
+
+class _Doc:
+    """Just the parts of a spaCy Doc that auto_tagging reads."""
+
+    def __init__(self, text):
+        self.tokens = [_Token(word) for word in re.findall(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]", text)]
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    @property
+    def noun_chunks(self):
+        # Runs of up to three content words stand in for noun phrases
+        run = []
+        for token in self.tokens + [None]:
+            if token is not None and token.is_alpha and not token.is_stop and len(run) < 3:
+                run.append(token)
+                continue
+            if run:
+                yield _Span(run)
+            run = [token] if token is not None and token.is_alpha and not token.is_stop else []
+
+    @property
+    def ents(self):
+        return [_Span([token]) for token in self.tokens[1:] if token.text[:1].isupper() and token.is_alpha]
+
+
+class StubNLP:
+    """Offline stand-in for the spaCy pipeline: regex tokens, content-word runs as noun chunks."""
+
+    def __call__(self, text):
+        return _Doc(text)
+
+    def pipe(self, texts, n_process=1, batch_size=64):
+        return (_Doc(text) for text in texts)
+
+
+class StubKeywordExtractor:
+    """Offline stand-in for yake.KeywordExtractor: the most frequent content words, best first."""
+
+    def __init__(self, top):
+        self.top = top
+
+    def extract_keywords(self, text):
+        counts = Counter(word for word in re.findall(r"[a-z]+", text.lower()) if word not in STOP_WORDS)
+        return [(word, 1.0 / count) for word, count in counts.most_common(self.top)]
+
+
+def use_stub_models():
+    """
+    Swap the embedding model for StubEmbedder (bypassing the on-disk cache),
+    spaCy for StubNLP, YAKE for StubKeywordExtractor and the summarizer for
+    StubBackend, so benchmarks run offline with none of them installed.
+    """
+    os.environ["NEURON_EMBEDDING_CACHE"] = "0"
+    import config
+    config.EMBEDDING_CACHE = False
+    import model_registry
+    # Import the real modules first so their loaders are registered, then replace them
+    import vector_embedding
+    import auto_tagging
+    import summarization
+    model_registry.register("embedding", StubEmbedder)
+    model_registry.register("spacy", StubNLP)
+    model_registry.register("summarizer", lambda: summarization.SummaryService(summarization.StubBackend()))
+    auto_tagging.get_keyword_extractor = StubKeywordExtractor
+
+
+def percentile(samples, q):
+    return float(np.percentile(np.asarray(samples), q))
+
+
+def time_calls(fn, repeat):
+    """Run fn() repeat times and return per-call latencies in milliseconds."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
@@ -0,0 +1,93 @@
+"""Runtime settings shared by the storage and ingest modules.
+
+Every value can be overridden with an environment variable of the same name
+prefixed with ``NEURON_`` (e.g. ``NEURON_STORE_DIR=/tmp/notes``).
+"""
+import os
+
+
+def _env(name, default, cast=str):
+    value = os.environ.get("NEURON_" + name)
+    return default if value is None else cast(value)
+
+
+# Legacy single-file database, read once as the migration source; exports go to EXPORT_FILE so it is never overwritten
+DB_FILE = _env("DB_FILE", "db.json")
+EXPORT_FILE = _env("EXPORT_FILE", "db_export.json")
+
+# Binary note store (metadata records + memory-mapped embedding matrix)
+STORE_DIR = _env("STORE_DIR", "neuron_store")
+EMBEDDING_DIM = _env("EMBEDDING_DIM", 384, int)
+EMBEDDING_DTYPE = _env("EMBEDDING_DTYPE", "float32")  # or "float16" to halve the matrix
+
+# Write-ahead journal: fold into the snapshot after this many records (0 disables)
+JOURNAL_COMPACT_EVERY = _env("JOURNAL_COMPACT_EVERY", 1000, int)
+JOURNAL_FSYNC = _env("JOURNAL_FSYNC", "1") not in ("0", "false", "no")
+
+# Nearest-neighbour index used for backlinks and semantic search: "brute" (exact, recommended),
+# "ivf" (approximate: scores the IVF_NPROBE nearest k-means lists, ~15x faster than brute at 100k),
+# quantized "int8" / "pq" (codes in RAM, top rerank * k re-scored from the float store), or
+# "hnsw" (experimental and warns: rebuilt in pure Python on every start, recall varies with the data)
+INDEX_TYPE = _env("INDEX_TYPE", "brute")
+INDEX_RERANK = _env("INDEX_RERANK", 4, int)
+IVF_NPROBE = _env("IVF_NPROBE", 8, int)
+PQ_RERANK = _env("PQ_RERANK", 32, int)
+PQ_SUBSPACES = _env("PQ_SUBSPACES", 48, int)
+
+# Backlinks: a note links to its top-k most similar notes at or above the threshold.
+# add_note also re-ranks up to BACKLINK_CANDIDATES existing neighbours above the threshold.
+BACKLINK_THRESHOLD = _env("BACKLINK_THRESHOLD", 0.65, float)
+BACKLINK_TOP_K = _env("BACKLINK_TOP_K", 3, int)
+BACKLINK_CANDIDATES = _env("BACKLINK_CANDIDATES", 32, int)
+
+# Sentence embedding model (vector_embedding.py)
+EMBEDDING_MODEL = _env("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = _env("EMBEDDING_BATCH_SIZE", 32, int)
+
+# Embedding cache in front of the model: in-memory LRU size and on-disk SQLite file ("" disables disk)
+EMBEDDING_CACHE = _env("EMBEDDING_CACHE", "1") not in ("0", "false", "no")
+EMBEDDING_CACHE_SIZE = _env("EMBEDDING_CACHE_SIZE", 10000, int)
+EMBEDDING_CACHE_PATH = _env("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+
+# Models are loaded on first use (model_registry.py); these are warmed ahead of time when asked
+WARM_MODELS = [name for name in _env("WARM_MODELS", "").split(",") if name]
+SPACY_MODEL = _env("SPACY_MODEL", "en_core_web_sm")
+WHISPER_MODEL = _env("WHISPER_MODEL", "tiny")
+
+# Summarization service (summarization.py): backend "ollama", "transformers" or "stub" (offline).
+# OLLAMA_HOST None uses the client default; SUMMARY_HF_MODEL is the transformers model.
+SUMMARY_BACKEND = _env("SUMMARY_BACKEND", "ollama")
+OLLAMA_HOST = _env("OLLAMA_HOST", None)
+SUMMARY_MODEL = _env("SUMMARY_MODEL", "llama3.2:1b")
+SUMMARY_HF_MODEL = _env("SUMMARY_HF_MODEL", "meta-llama/Llama-3.2-1B-Instruct")
+SUMMARY_MAX_TOKENS = _env("SUMMARY_MAX_TOKENS", 512, int)
+# Generations in flight at once, and waiting requests merged into one backend call
+SUMMARY_CONCURRENCY = _env("SUMMARY_CONCURRENCY", 2, int)
+SUMMARY_BATCH_SIZE = _env("SUMMARY_BATCH_SIZE", 4, int)
+# Transcripts longer than this many tokens are summarized map-reduce style in chunks of this size
+# (kept under the 1024-token inputs the summarizer is fine-tuned on), overlapping by SUMMARY_CHUNK_OVERLAP
+SUMMARY_CHUNK_TOKENS = _env("SUMMARY_CHUNK_TOKENS", 896, int)
+SUMMARY_CHUNK_OVERLAP = _env("SUMMARY_CHUNK_OVERLAP", 64, int)
+
+# Ingest pipeline (ingest.py): max jobs waiting between two stages
+INGEST_QUEUE_SIZE = _env("INGEST_QUEUE_SIZE", 2, int)
+
+# Hybrid search (search.py): weight of vector similarity vs. BM25 keyword score,
+# candidates taken from each retriever, and the tag-filter size scored exhaustively
+HYBRID_ALPHA = _env("HYBRID_ALPHA", 0.7, float)
+HYBRID_CANDIDATES = _env("HYBRID_CANDIDATES", 50, int)
+HYBRID_EXACT_FILTER = _env("HYBRID_EXACT_FILTER", 5000, int)
+
+# Local HTTP server (server.py); responses at least this large are gzipped when the client accepts it
+SERVER_HOST = _env("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = _env("SERVER_PORT", 8000, int)
+SERVER_GZIP_MIN_BYTES = _env("SERVER_GZIP_MIN_BYTES", 1024, int)
+
+# Graph export (db.graph_export): above this many notes the graph is collapsed into
+# about GRAPH_CLUSTERS embedding clusters
+GRAPH_COLLAPSE_ABOVE = _env("GRAPH_COLLAPSE_ABOVE", 2000, int)
+GRAPH_CLUSTERS = _env("GRAPH_CLUSTERS", 100, int)
+
+# Metrics (metrics.py): off unless METRICS is set; METRICS_FILE also dumps them at exit (.prom for Prometheus text)
+METRICS = _env("METRICS", "0") not in ("0", "false", "no")
+METRICS_FILE = _env("METRICS_FILE", None)
@@ -1,49 +1,367 @@
 import os
-import json
 import uuid
-from vector_embedding import generate_embedding
+from collections import Counter
 
+import config
+import metrics
+import model_registry
+from note_store import NoteStore, migrate_json, export_json
+from vector_index import build_index, kmeans, assign_clusters
+from inverted_index import build_inverted_index
+from vector_embedding import generate_embedding, generate_embeddings
+from auto_tagging import extract_tags, tag_many
+from term_stats import DocumentFrequencies, tokenize
 
-DB_FILE = "db.json"
+
+DB_FILE = config.DB_FILE
+STORE_DIR = config.STORE_DIR
+
+_store = None
+_index = None
+_term_stats = None
+_inverted = None
+_graph_cache = {}        # export options -> (epoch, version, graph)
+_graph_centroids = None  # (epoch, notes at training, centroids)
+
+def get_store():
+    """Open the note store once per process, migrating db.json on first run."""
+    global _store
+    if _store is None:
+        with metrics.timer("db.open_store"):
+            if not os.path.exists(STORE_DIR) and os.path.exists(DB_FILE):
+                _store = migrate_json(DB_FILE, STORE_DIR)
+            else:
+                _store = NoteStore(STORE_DIR)
+    return _store
+
+def get_index():
+    """Nearest-neighbour index over the store, built on first use and kept in sync by add_note."""
+    global _index
+    if _index is None:
+        store = get_store()
+        with metrics.timer("db.build_index"):
+            _index = build_index(store, config.INDEX_TYPE)
+    return _index
+
+def get_inverted_index():
+    """Tag/term postings over the store's metadata, built on first use and kept in sync by add_note."""
+    global _inverted
+    if _inverted is None:
+        store = get_store()
+        with metrics.timer("db.build_inverted_index"):
+            _inverted = build_inverted_index(store)
+    return _inverted
+
+@metrics.timed("db.query_notes")
+def query_notes(all_tags=(), any_tags=(), terms=(), prefix=None, page=0, page_size=20):
+    """
+    Filtered note lookup through the inverted index: notes with every tag in
+    all_tags, any tag in any_tags, every word in terms and (optionally) a
+    word or tag starting with prefix. Returns (total, notes) for one page,
+    newest first, without embeddings.
+    """
+    store = get_store()
+    total, ids = get_inverted_index().query(all_tags, any_tags, terms, prefix, page, page_size)
+    return total, [store.get(note_id) for note_id in ids]
+
+def get_term_stats():
+    """
+    Document frequencies over all stored notes, persisted next to the store.
+    A store that predates the stats is counted once; after that add_note
+    keeps them current.
+    """
+    global _term_stats
+    if _term_stats is None:
+        store = get_store()
+        _term_stats = DocumentFrequencies(STORE_DIR)
+        if _term_stats.n_docs == 0 and len(store):
+            _term_stats.add_documents(tokenize(note["text"]) for note in store.notes)
+    return _term_stats
+
+def close():
+    """Close the store and stats files and drop every lazily built structure; the next call reopens."""
+    global _store, _index, _inverted, _term_stats, _graph_centroids
+    if _term_stats is not None:
+        _term_stats.close()
+    if _store is not None:
+        _store.close()
+    _store = _index = _inverted = _term_stats = _graph_centroids = None
+    _graph_cache.clear()
+
+def reset(store_dir=None):
+    """close(), then point the module at another store directory (benchmarks, tests)."""
+    global STORE_DIR
+    close()
+    if store_dir is not None:
+        STORE_DIR = store_dir
+
+@metrics.timed("db.backlink_candidates")
+def backlink_candidates(embedding, exclude=None):
+    """Existing notes at or above the backlink threshold, best first."""
+    return get_index().search(embedding, k=max(config.BACKLINK_TOP_K, config.BACKLINK_CANDIDATES),
+                              min_score=config.BACKLINK_THRESHOLD, exclude=exclude)
+
+@metrics.timed("db.update_reverse_backlinks")
+def update_reverse_backlinks(note_id, matches):
+    """
+    Fold an indexed note into the backlinks of the neighbours it matched,
+    where it now outranks their weakest link. Only those notes are rewritten,
+    so an insert costs one index query plus O(candidates * top_k) dot
+    products instead of a corpus-wide rebuild.
+    """
+    store = get_store()
+    index = get_index()
+    top_k = config.BACKLINK_TOP_K
+    changes = {}
+    for other_id, score in matches:
+        current = [b for b in store.get(other_id).get("backlinks", []) if b in index]
+        if note_id in current:
+            continue
+        other_vector = index.vector(other_id)
+        ranked = [(b, float(index.vector(b) @ other_vector)) for b in current]
+        if len(ranked) >= top_k and score <= min(s for _, s in ranked):
+            continue
+        ranked.append((note_id, score))
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        changes[other_id] = {"backlinks": [b for b, _ in ranked[:top_k]]}
+    if changes:
+        store.update_many(changes)
+    return changes
+
+@metrics.timed("db.backfill_tags")
+def backfill_tags(n_process=1, batch_size=64):
+    """Re-tag every stored note in one nlp.pipe pass and journal the changed ones."""
+    store = get_store()
+    notes = list(store.iter_notes())
+    tags = tag_many([note["text"] for note in notes], n_process=n_process, batch_size=batch_size,
+                    stats=get_term_stats())
+    changes = {note["id"]: {"tags": note_tags}
+               for note, note_tags in zip(notes, tags) if note_tags != note.get("tags")}
+    if changes:
+        store.update_many(changes)
+        if _inverted is not None:
+            old_tags = {note["id"]: note.get("tags", []) for note in notes}
+            for note_id, fields in changes.items():
+                _inverted.set_tags(note_id, old_tags[note_id], fields["tags"])
+    print(f"Re-tagged {len(notes)} notes ({len(changes)} changed).")
+    return len(changes)
 
 def load_db():
-    if os.path.exists(DB_FILE):
-        with open(DB_FILE, "r") as f:
-            return json.load(f)
-    return []
+    # Embeddings are memory-mapped rows, not parsed lists
+    return list(get_store().iter_notes(with_embeddings=True))
 
 def save_db(data):
-    with open(DB_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    # Only metadata is mutable; new notes are appended with their embeddings
+    store = get_store()
+    stats = get_term_stats()  # bootstrapped before the write, so new notes are counted once
+    global _inverted
+    changes = {note["id"]: note for note in data if note["id"] in store}
+    new = [note for note in data if note["id"] not in store]
+    if changes or new:
+        _inverted = None  # rebuilt from the store on next query
+    if changes:
+        store.update_many(changes)
+    if new:
+        store.extend(new, [note["embedding"] for note in new])
+        if _index is not None:
+            _index.add([note["id"] for note in new], [note["embedding"] for note in new])
+        stats.add_documents(tokenize(note["text"]) for note in new)
+
+def export_db(json_path=config.EXPORT_FILE, include_embeddings=False):
+    # Legacy db.json layout for older scripts; force_graph.html reads graph_export via server.py
+    return export_json(get_store(), json_path, include_embeddings)
+
+def _collapse_graph(store, clusters):
+    """Group notes into embedding clusters; links count backlinks between clusters."""
+    global _graph_centroids
+    n = len(store)
+    # Centroids are reused until the store doubles, so a refresh only reassigns
+    if _graph_centroids is None or _graph_centroids[0] != store.epoch or n > 2 * _graph_centroids[1]:
+        _graph_centroids = (store.epoch, n, kmeans(store.embeddings, clusters))
+    labels = assign_clusters(store.embeddings, _graph_centroids[2])
+
+    used = sorted(set(labels.tolist()))
+    position = {label: i for i, label in enumerate(used)}
+    sizes = [0] * len(used)
+    tags = [Counter() for _ in used]
+    for note, label in zip(store.notes, labels.tolist()):
+        sizes[position[label]] += 1
+        tags[position[label]].update(note.get("tags", []))
 
-def add_note(summary_text):
-    db = load_db()
+    weights = Counter()
+    for note, label in zip(store.notes, labels.tolist()):
+        for target in note.get("backlinks", []):
+            if target in store:
+                a, b = position[label], position[int(labels[store.row(target)])]
+                if a != b:
+                    weights[min(a, b), max(a, b)] += 1
+
+    nodes = [{"id": f"cluster_{i}", "size": size, "tags": [t for t, _ in counts.most_common(3)]}
+             for i, (size, counts) in enumerate(zip(sizes, tags))]
+    return nodes, [[a, b, w] for (a, b), w in sorted(weights.items())]
+
+@metrics.timed("db.graph_export")
+def graph_export(collapse_above=config.GRAPH_COLLAPSE_ABOVE, clusters=config.GRAPH_CLUSTERS):
+    """
+    Backlink graph for force_graph.html, without text or embeddings:
+    {"epoch", "version", "collapsed": False, "nodes": [{"id", "tags"}],
+    "links": [[source, target], ...]} with links given as node positions.
+    Above collapse_above notes (0 never collapses) nodes are instead about
+    `clusters` embedding clusters {"id", "size", "tags"} and links are
+    [a, b, backlink count]. Cached until the store changes.
+    """
+    store = get_store()
+    key = (collapse_above, clusters)
+    cached = _graph_cache.get(key)
+    if cached is not None and cached[:2] == (store.epoch, store.version):
+        return cached[2]
+
+    version = store.version
+    graph = {"epoch": store.epoch, "version": version}
+    if collapse_above and len(store) > collapse_above:
+        graph["nodes"], graph["links"] = _collapse_graph(store, clusters)
+        graph["collapsed"] = True
+    else:
+        notes = store.notes
+        graph["nodes"] = [{"id": note["id"], "tags": note.get("tags", [])} for note in notes]
+        graph["links"] = [[row, store.row(target)] for row, note in enumerate(notes)
+                          for target in note.get("backlinks", []) if target in store]
+        graph["collapsed"] = False
+    _graph_cache[key] = (store.epoch, version, graph)
+    return graph
+
+def graph_delta(since, epoch=None, collapse_above=config.GRAPH_COLLAPSE_ABOVE, clusters=config.GRAPH_CLUSTERS):
+    """
+    Notes added or re-linked after version `since` of this store's epoch:
+    {"epoch", "version", "since", "full": False, "nodes": [{"id", "tags",
+    "backlinks"}]}. A viewer upserts each node and replaces its outgoing
+    links. When `since` is from another epoch or ahead of the store, or the
+    graph is collapsed and has changed, the full graph_export() is returned
+    with "full": True instead.
+    """
+    store = get_store()
+    if epoch != store.epoch or since > store.version or (
+            collapse_above and len(store) > collapse_above and since < store.version):
+        return dict(graph_export(collapse_above, clusters), full=True)
+    version = store.version
+    nodes = [{"id": note["id"], "tags": note.get("tags", []),
+              "backlinks": [b for b in note.get("backlinks", []) if b in store]}
+             for note in (store.notes[row] for row in store.changed_since(since))]
+    return {"epoch": store.epoch, "version": version, "since": since, "full": False, "nodes": nodes}
+
+def new_note_id():
+    # 64 random bits, so collisions stay negligible at any store size (older notes keep their 4-hex ids)
+    store = get_store()
+    while True:
+        note_id = f"summary_{uuid.uuid4().hex[:16]}"
+        if note_id not in store:
+            return note_id
+
+@metrics.timed("db.add_note")
+def add_note(summary_text, tags=None, embedding=None):
+    """
+    Store a summary as a new note. Tags and the embedding are computed here
+    unless the caller (e.g. the ingest pipeline) already has them.
+    """
+    store = get_store()
+    # Before the append: a first-use bootstrap must not count this note on top of add_document
+    stats = get_term_stats()
 
     # Generate ID and embedding
-    note_id = f"summary_{str(uuid.uuid4())[:4]}"
-    embedding = generate_embedding(summary_text)
+    note_id = new_note_id()
+    if embedding is None:
+        embedding = generate_embedding(summary_text)
 
     # Generate tags
-    # tags = extract_tags(summary_text)
+    if tags is None:
+        tags = extract_tags(summary_text, stats=stats)
 
     # Create base note
     note = {
         "id": note_id,
-        "embedding": embedding,
         "text": summary_text,
-        "tags": [],
+        "tags": list(tags),
         "backlinks": []
     }
 
-    # Compute backlinks with cosine similarity ≥ 0.8
-   
+    # Compute backlinks with cosine similarity ≥ config.BACKLINK_THRESHOLD
+    matches = backlink_candidates(embedding)
+    note["backlinks"] = [other_id for other_id, _ in matches[:config.BACKLINK_TOP_K]]
+
+    store.append(note, embedding)
+    get_index().add([note_id], [embedding])
+    if _inverted is not None:
+        _inverted.add(note_id, summary_text, note["tags"])
 
-    db.append(note)
-    save_db(db)
+    # The new note may now belong in its neighbours' own top-k
+    update_reverse_backlinks(note_id, matches)
+    stats.add_document(tokenize(summary_text))
     print(f"Note '{note_id}' added.")
+    return note_id
+
+@metrics.timed("db.add_notes")
+def add_notes(summary_texts, batch_size=config.EMBEDDING_BATCH_SIZE, tags=None):
+    """
+    Bulk insert: embed every summary in batches, append them in one store
+    write, then link backlinks (new notes can link to each other). tags, if
+    given, is one tag list per summary. Returns the new note ids.
+    """
+    store = get_store()
+    index = get_index()
+    stats = get_term_stats()  # before the store write, as in add_note
+    summary_texts = list(summary_texts)
+    embeddings = generate_embeddings(summary_texts, batch_size=batch_size)
+    if tags is None:
+        tags = tag_many(summary_texts, stats=stats)
+
+    notes = []
+    ids = set()
+    for summary_text, note_tags in zip(summary_texts, tags):
+        note_id = new_note_id()
+        while note_id in ids:
+            note_id = new_note_id()
+        ids.add(note_id)
+        notes.append({"id": note_id, "text": summary_text, "tags": list(note_tags), "backlinks": []})
+
+    note_ids = [note["id"] for note in notes]
+    store.extend(notes, embeddings)
+    index.add(note_ids, embeddings)
+    if _inverted is not None:
+        for note in notes:
+            _inverted.add(note["id"], note["text"], note["tags"])
+
+    for note_id, embedding in zip(note_ids, embeddings):
+        matches = backlink_candidates(embedding, exclude={note_id})
+        store.update(note_id, backlinks=[other_id for other_id, _ in matches[:config.BACKLINK_TOP_K]])
+        update_reverse_backlinks(note_id, matches)
+    stats.add_documents(tokenize(summary_text) for summary_text in summary_texts)
+
+    print(f"{len(note_ids)} notes added.")
+    return note_ids
+
+@metrics.register_collector
+def _store_sizes():
+    """Sizes of whatever is already open; never opens the store just to report on it."""
+    sizes = {}
+    if _store is not None:
+        sizes["store.notes"] = len(_store)
+        sizes["store.journal_records"] = _store.journal.count
+        sizes["store.embeddings_bytes"] = os.path.getsize(_store.embeddings_path)
+    if _index is not None:
+        sizes["index.vectors"] = len(_index)
+        sizes["index.memory_bytes"] = _index.memory_bytes()
+    if _inverted is not None:
+        sizes["inverted.terms"] = len(_inverted.terms)
+        sizes["inverted.tags"] = len(_inverted.tags)
+    if _term_stats is not None:
+        sizes["term_stats.terms"] = len(_term_stats.df)
+    return sizes
 
 # Example usage
 if __name__ == "__main__":
+    # Load the embedder while the store opens and the samples are prepared
+    model_registry.warm(["embedding"])
+
     sample_summary1 = """
 Meeting Summary: Arbitrage Model for Index Basket Trading
 Overview:
@@ -176,4 +494,3 @@ Remaining Tasks:
 - Schedule full production deployment with monitoring active for first week.    
 """
     add_note(sample_summary5)
-    
\ No newline at end of file
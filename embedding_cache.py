@@ -0,0 +1,116 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+import config
+
+
+def normalize_text(text):
+    # Re-imported summaries often differ only in surrounding/internal whitespace
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by sha256(model name + normalized text).
+
+    - memory: LRU of at most max_items vectors
+    - disk: SQLite table at path (skipped when path is empty), shared across
+      runs so re-running ingest scripts or migrations reuses vectors
+
+    The disk tier remembers which model filled it and is cleared when opened
+    with a different model name.
+    """
+
+    def __init__(self, model_name, path=config.EMBEDDING_CACHE_PATH,
+                 max_items=config.EMBEDDING_CACHE_SIZE):
+        self.model_name = model_name
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+            if row is None or row[0] != model_name:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('model', ?)", (model_name,))
+            self._db.commit()
+
+    def key(self, text, normalize=True):
+        raw = f"{self.model_name}\0{int(normalize)}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts, normalize=True):
+        """Return a list aligned with texts holding cached vectors or None."""
+        keys = [self.key(text, normalize) for text in texts]
+        found = [None] * len(keys)
+        with self._lock:
+            missing = {}
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[i] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing and self._db is not None:
+                wanted = list(missing)
+                for start in range(0, len(wanted), 500):  # stay under SQLite's variable limit
+                    chunk = wanted[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, vector)
+                        for i in missing.pop(key):
+                            found[i] = vector
+                            self.disk_hits += 1
+
+            self.misses += sum(len(positions) for positions in missing.values())
+        return found
+
+    def put_many(self, texts, vectors, normalize=True):
+        keys = [self.key(text, normalize) for text in texts]
+        vectors = [np.asarray(v, dtype=np.float32) for v in vectors]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                                     [(key, vector.tobytes()) for key, vector in zip(keys, vectors)])
+                self._db.commit()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
@@ -0,0 +1,198 @@
+"""
+End-to-end ingest: audio -> transcript -> summary -> tags -> embedding -> store.
+
+Each stage runs on its own thread(s) and hands jobs to the next through a
+bounded queue, so while file N is being summarized file N+1 is already being
+transcribed. Whisper and torch release the GIL and the summarize workers
+wait on the summarization service, so threads are enough for the stages to
+overlap. Several summarize workers keep the service's queue full, so it can
+batch transcripts and one long summary does not hold up the rest.
+
+    python ingest.py recordings/ meeting.mp3 [--queue-size 2]
+"""
+import time
+import queue
+import argparse
+import threading
+from contextlib import nullcontext
+from collections import defaultdict
+
+import config
+import metrics
+import model_registry
+from transcribe_audio import transcribe, find_audio_files
+from llama_summarizer import summarize
+from auto_tagging import extract_tags
+from vector_embedding import generate_embedding
+from db import add_note, get_term_stats
+
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    Run jobs (dicts) through named stages. A stage is (name, fn, workers):
+    fn(job) fills in more of the job and returns it. Queues between stages
+    hold at most queue_size jobs, which bounds memory and keeps a slow
+    stage from being buried. A job whose stage raises carries the error in
+    job["error"] and skips the remaining stages.
+    """
+
+    def __init__(self, stages, queue_size=config.INGEST_QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.timings = defaultdict(list)  # stage name -> seconds per job
+        self._timings_lock = threading.Lock()
+
+    def run(self, jobs):
+        """
+        Feed jobs through every stage, yielding them as they leave the last
+        one. If iterating jobs raises, the jobs already fed still finish and
+        the error is raised afterwards.
+        """
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = []
+        for i, (name, fn, workers) in enumerate(self.stages):
+            next_workers = self.stages[i + 1][2] if i + 1 < len(self.stages) else 1
+            remaining = [workers]  # last worker of a stage to finish passes _DONE on
+            lock = threading.Lock()
+            for _ in range(workers):
+                thread = threading.Thread(target=self._work, name=f"ingest-{name}", daemon=True,
+                                          args=(name, fn, queues[i], queues[i + 1],
+                                                next_workers, remaining, lock))
+                thread.start()
+                threads.append(thread)
+
+        feed_errors = []
+
+        def feed():
+            try:
+                for job in jobs:
+                    queues[0].put(job)
+            except Exception as e:
+                feed_errors.append(e)
+            finally:
+                # Always release the stages, or the loop below waits forever
+                for _ in range(self.stages[0][2]):
+                    queues[0].put(_DONE)
+
+        threading.Thread(target=feed, name="ingest-feed", daemon=True).start()
+
+        while True:
+            job = queues[-1].get()
+            if job is _DONE:
+                break
+            yield job
+        for thread in threads:
+            thread.join()
+        if feed_errors:
+            raise feed_errors[0]
+
+    def _work(self, name, fn, inbox, outbox, next_workers, remaining, lock):
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    # Release every worker of the next stage
+                    for _ in range(next_workers):
+                        outbox.put(_DONE)
+                return
+            if "error" not in job:
+                start = time.perf_counter()
+                try:
+                    job = fn(job)
+                except Exception as e:
+                    job["error"] = f"{name}: {e!r}"
+                elapsed = time.perf_counter() - start
+                job.setdefault("timings", {})[name] = elapsed
+                with self._timings_lock:
+                    self.timings[name].append(elapsed)
+                metrics.observe(f"ingest.{name}", elapsed)
+            outbox.put(job)
+
+    def report(self):
+        """Per-stage {"jobs", "total", "mean", "max"} seconds."""
+        with self._timings_lock:
+            return {
+                name: {"jobs": len(t), "total": sum(t), "mean": sum(t) / len(t), "max": max(t)}
+                for name, t in self.timings.items() if t
+            }
+
+
+def _transcribe(job):
+    job["transcript"] = transcribe(job["audio_path"])
+    return job
+
+def _summarize(job):
+    job["summary"] = summarize(job["transcript"])
+    return job
+
+def _tag(job):
+    job["tags"] = extract_tags(job["summary"], stats=get_term_stats())
+    return job
+
+def _embed(job):
+    job["embedding"] = generate_embedding(job["summary"])
+    return job
+
+def _store(job):
+    job["note_id"] = add_note(job["summary"], tags=job["tags"], embedding=job["embedding"])
+    return job
+
+
+SUMMARIZE_WORKERS = config.SUMMARY_CONCURRENCY * config.SUMMARY_BATCH_SIZE
+
+def ingest_pipeline(queue_size=config.INGEST_QUEUE_SIZE, transcribe_workers=1, summarize_workers=SUMMARIZE_WORKERS):
+    return Pipeline([
+        ("transcribe", _transcribe, transcribe_workers),
+        ("summarize", _summarize, summarize_workers),
+        ("tag", _tag, 1),
+        ("embed", _embed, 1),
+        ("store", _store, 1),  # single writer keeps note ids and backlinks consistent
+    ], queue_size=queue_size)
+
+
+def ingest(audio_paths, pipeline=None):
+    """Ingest audio files, yielding each finished job (note_id or error, timings)."""
+    pipeline = pipeline or ingest_pipeline()
+    return pipeline.run({"audio_path": path} for path in audio_paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe, summarize, tag, embed and store recordings.")
+    parser.add_argument("paths", nargs="+", help="audio files or directories")
+    parser.add_argument("--queue-size", type=int, default=config.INGEST_QUEUE_SIZE)
+    parser.add_argument("--transcribe-workers", type=int, default=1)
+    parser.add_argument("--summarize-workers", type=int, default=SUMMARIZE_WORKERS)
+    parser.add_argument("--metrics", metavar="PATH", help="record metrics and write them to PATH (.prom or .json)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="PATH",
+                        help="cProfile the run; with PATH also save the stats there")
+    parser.add_argument("--trace-memory", action="store_true", help="report allocations with tracemalloc")
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.enable()
+    profiling = args.profile is not None or args.trace_memory
+
+    with metrics.profile(args.profile or None, memory=args.trace_memory) if profiling else nullcontext():
+        # Models load in the background while the first file is being decoded
+        model_registry.warm(["whisper", "summarizer", "spacy", "embedding"])
+
+        pipeline = ingest_pipeline(args.queue_size, args.transcribe_workers, args.summarize_workers)
+        start = time.perf_counter()
+        for job in ingest(find_audio_files(args.paths), pipeline):
+            if "error" in job:
+                print(f"{job['audio_path']}: FAILED ({job['error']})")
+            else:
+                print(f"{job['audio_path']}: note {job['note_id']} tags={job['tags']}")
+        wall = time.perf_counter() - start
+
+    print(f"\n{'stage':>10} {'jobs':>5} {'total s':>9} {'mean s':>8} {'max s':>8}")
+    for name, stats in pipeline.report().items():
+        print(f"{name:>10} {stats['jobs']:5d} {stats['total']:9.2f} {stats['mean']:8.2f} {stats['max']:8.2f}")
+    print(f"{'wall':>10} {'':5} {wall:9.2f}")
+    if args.metrics:
+        print(f"Metrics written to {metrics.dump(args.metrics)}")
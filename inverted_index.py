@@ -0,0 +1,178 @@
+import math
+from bisect import bisect_left, insort
+
+from term_stats import tokenize
+
+
+class InvertedIndex:
+    """
+    Tag and text-term postings over notes, for filtered lookups that never
+    touch embeddings or scan every note.
+
+    Notes are numbered in insertion order (doc numbers); postings map a tag
+    to a set of doc numbers and a text term to {doc number: term count}.
+    Sorted vocabularies back prefix lookups. Term counts and document
+    lengths are kept for relevance scoring.
+    """
+
+    def __init__(self):
+        self.ids = []          # doc number -> note id
+        self._docs = {}        # note id -> doc number
+        self.doc_lengths = []  # doc number -> number of terms
+        self.total_length = 0
+        self.tags = {}         # tag -> {doc}
+        self.terms = {}        # term -> {doc: count}
+        self._sorted_tags = []
+        self._sorted_terms = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, note_id):
+        return note_id in self._docs
+
+    def add(self, note_id, text, tags=()):
+        if note_id in self._docs:
+            raise ValueError(f"'{note_id}' is already indexed")
+        doc = len(self.ids)
+        self.ids.append(note_id)
+        self._docs[note_id] = doc
+
+        counts = {}
+        words = tokenize(text)
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        self.doc_lengths.append(len(words))
+        self.total_length += len(words)
+        for term, count in counts.items():
+            postings = self.terms.get(term)
+            if postings is None:
+                postings = self.terms[term] = {}
+                insort(self._sorted_terms, term)
+            postings[doc] = count
+
+        self._add_tags(doc, tags)
+
+    @staticmethod
+    def _normalize_tags(tags):
+        # Same form match() and tags_with_prefix() look up, so "Roadmap" is found as "roadmap"
+        return {tag.lower().strip() for tag in tags} - {""}
+
+    def _add_tags(self, doc, tags):
+        for tag in self._normalize_tags(tags):
+            postings = self.tags.get(tag)
+            if postings is None:
+                postings = self.tags[tag] = set()
+                insort(self._sorted_tags, tag)
+            postings.add(doc)
+
+    def set_tags(self, note_id, old_tags, new_tags):
+        """Move a note's tag postings after it is re-tagged."""
+        doc = self._docs[note_id]
+        for tag in self._normalize_tags(old_tags) - self._normalize_tags(new_tags):
+            postings = self.tags.get(tag)
+            if postings is not None:
+                postings.discard(doc)
+        self._add_tags(doc, new_tags)
+
+    @staticmethod
+    def _with_prefix(vocabulary, prefix, limit=None):
+        start = bisect_left(vocabulary, prefix)
+        found = []
+        for word in vocabulary[start:]:
+            if not word.startswith(prefix) or (limit is not None and len(found) >= limit):
+                break
+            found.append(word)
+        return found
+
+    def tags_with_prefix(self, prefix, limit=None):
+        return [t for t in self._with_prefix(self._sorted_tags, prefix.lower(), limit) if self.tags[t]]
+
+    def terms_with_prefix(self, prefix, limit=None):
+        return self._with_prefix(self._sorted_terms, prefix.lower(), limit)
+
+    def match(self, all_tags=(), any_tags=(), terms=(), prefix=None):
+        """
+        Doc numbers matching every filter: all of all_tags, at least one of
+        any_tags, every word of terms (tokenized like note text) and, with
+        prefix, at least one text term or tag starting with it. Returns None
+        when no filter is given (everything matches).
+        """
+        if isinstance(terms, str):
+            terms = [terms]
+        all_tags = self._normalize_tags(all_tags)
+        any_tags = self._normalize_tags(any_tags)
+        sets = []
+        for tag in all_tags:
+            sets.append(self.tags.get(tag, set()))
+        if any_tags:
+            sets.append(set().union(*(self.tags.get(tag, set()) for tag in any_tags)))
+        for term in tokenize(" ".join(terms)) if terms else ():
+            sets.append(self.terms.get(term, {}).keys())
+        if prefix:
+            expanded = set()
+            for term in self.terms_with_prefix(prefix):
+                expanded.update(self.terms[term])
+            for tag in self.tags_with_prefix(prefix):
+                expanded.update(self.tags[tag])
+            sets.append(expanded)
+
+        if not sets:
+            return None
+        sets.sort(key=len)  # intersect from the rarest filter
+        result = set(sets[0])
+        for other in sets[1:]:
+            result.intersection_update(other)
+            if not result:
+                break
+        return result
+
+    def bm25(self, terms, k1=1.5, b=0.75, docs=None):
+        """
+        Okapi BM25 score of every note containing at least one query word,
+        as {doc number: score}. Only the query words' postings are read.
+        With docs, only those doc numbers are scored.
+        """
+        if isinstance(terms, str):
+            terms = [terms]
+        n = len(self.ids)
+        if not n:
+            return {}
+        avg_length = self.total_length / n or 1
+        scores = {}
+        for term in set(tokenize(" ".join(terms))):
+            postings = self.terms.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            items = postings.items() if docs is None else (
+                (d, postings[d]) for d in docs if d in postings)
+            for doc, tf in items:
+                norm = k1 * (1 - b + b * self.doc_lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def doc(self, note_id):
+        return self._docs[note_id]
+
+    def query(self, all_tags=(), any_tags=(), terms=(), prefix=None, page=0, page_size=20):
+        """
+        Page through matching note ids, newest first. Returns (total, ids).
+        """
+        docs = self.match(all_tags, any_tags, terms, prefix)
+        if docs is None:
+            total = len(self.ids)
+            ordered = range(total - 1, -1, -1)
+            window = ordered[page * page_size:(page + 1) * page_size]
+        else:
+            total = len(docs)
+            window = sorted(docs, reverse=True)[page * page_size:(page + 1) * page_size]
+        return total, [self.ids[doc] for doc in window]
+
+
+def build_inverted_index(store):
+    """Index every note's text and tags from the store's metadata records."""
+    index = InvertedIndex()
+    for note in store.notes:
+        index.add(note["id"], note["text"], note.get("tags", ()))
+    return index
@@ -0,0 +1,120 @@
+import os
+import json
+
+
+def fsync_dir(path):
+    # Persist a rename; not supported on every platform (e.g. Windows)
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_lines(path, lines):
+    """Write an iterable of text lines to path via temp file + fsync + os.replace."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for line in lines:
+            f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path))
+
+
+class Journal:
+    """
+    Append-only JSON-lines log. Each record is written and fsynced before
+    append() returns, so a crash loses at most the record being written; a
+    torn final line is dropped on replay.
+
+    Compaction is done by the owner in two steps: rotate() moves the live
+    log aside (new records keep going to a fresh file) and, once the owner
+    has written its snapshot, discard_rotated() deletes the old segment.
+    Replay reads the rotated segment first, so records must be idempotent.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.rotated_path = path + ".1"
+        self.fsync = fsync
+        self.count = 0  # records in the live segment
+        self._file = None
+
+    def replay(self):
+        """Yield every record from the rotated and live segments, in order."""
+        self.count = 0
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            live = path == self.path
+            good_bytes = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn write, everything after it is garbage
+                    if not line.endswith(b"\n"):
+                        break
+                    good_bytes += len(line)
+                    if live:
+                        self.count += 1
+                    yield record
+            if os.path.getsize(path) != good_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(good_bytes)
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a")
+        return self._file
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        if not records:
+            return
+        f = self._open()
+        f.write("".join(json.dumps(r) + "\n" for r in records))
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        self.count += len(records)
+
+    def has_rotated(self):
+        return os.path.exists(self.rotated_path)
+
+    def rotate(self):
+        """Move the live segment aside and start a new empty one."""
+        self.close()
+        if not os.path.exists(self.path):
+            pass
+        elif os.path.exists(self.rotated_path):
+            # A previous compaction never finished; keep both segments' records
+            with open(self.path, "rb") as src, open(self.rotated_path, "ab") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+        fsync_dir(os.path.dirname(self.path))
+        self.count = 0
+
+    def discard_rotated(self):
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+            fsync_dir(os.path.dirname(self.path))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,9 +1,10 @@
-from ollama import chat
-from ollama import ChatResponse
-from ollama import Client
 import markdown
 import re
 
+import config
+import metrics
+from summarization import get_service
+
 def markdown_to_text(markdown_string):
     """Converts a markdown string to plaintext."""
 
@@ -15,10 +16,20 @@ def markdown_to_text(markdown_string):
 
     return text
 
-client = Client() 
-prompt = f"""Make the following transcript into organized BULLETED meeting notes in markdown syntax. Make sure to add bullets. Add headers when necessary. 
+PROMPT_TEMPLATE = """Make the following transcript into organized BULLETED meeting notes in markdown syntax. Make sure to add bullets. Add headers when necessary. 
 Transcript: 
- Yeah so for the creating bot its like an arbitrage model So do you know what arbitrage 
+{transcript}"""
+
+# Map-reduce mode for long transcripts: notes per chunk, then one merge into the usual format
+CHUNK_PROMPT_TEMPLATE = """This is part {part} of {parts} of a meeting transcript. Write BULLETED notes in markdown of the key points, decisions and action items in this part only. Do not add headers.
+Transcript part:
+{transcript}"""
+
+REDUCE_PROMPT_TEMPLATE = """Below are bulleted notes from consecutive parts of one meeting. Merge them into organized BULLETED meeting notes in markdown syntax. Remove repeated points but keep every distinct decision and action item. Make sure to add bullets. Add headers when necessary.
+Notes:
+{notes}"""
+
+SAMPLE_TRANSCRIPT = """ Yeah so for the creating bot its like an arbitrage model So do you know what arbitrage 
  is No Okay so we have a index fund right Okay Like SB is like a bunch of different stocks 
  in it But its prices are not exactly determined by those individual stocks but rather like
    has its every pricing fits on as well Separate supply demand So sometimes they can eat pricing 
@@ -43,11 +54,107 @@ Transcript:
        but this is the actual code And ChatGPT write the like edit the thing to write the code 
        when we liquidate our positions """
 
-response = client.generate(model='llama3.2:1b', prompt=prompt)
-markdown_text = response['response']
-final_text = markdown_to_text(markdown_text)
-# for chunk in response:
-#     print(chunk['response'], end='\n', flush=True)
+def chunk_transcript(transcript, max_tokens=config.SUMMARY_CHUNK_TOKENS,
+                     overlap_tokens=config.SUMMARY_CHUNK_OVERLAP, count_tokens=None):
+    """
+    Split a transcript into chunks of about max_tokens tokens, cut between
+    words (after a sentence end when one falls in the last quarter of the
+    window). Consecutive chunks share overlap_tokens so a point made across
+    a boundary appears whole in at least one chunk.
+    """
+    count_tokens = count_tokens or get_service().backend.count_tokens
+    words = transcript.split()
+    if not words:
+        return []
+    # One tokenizer pass over the whole text gives the tokens-per-word rate for sizing windows
+    per_word = max(count_tokens(transcript) / len(words), 1e-6)
+    size = max(1, int(max_tokens / per_word))
+    overlap = min(int(overlap_tokens / per_word), size // 2)
+
+    chunks = []
+    start = 0
+    while True:
+        end = min(start + size, len(words))
+        if end < len(words):
+            for cut in range(end, start + size * 3 // 4, -1):
+                if words[cut - 1][-1] in ".?!":
+                    end = cut
+                    break
+        chunks.append(" ".join(words[start:end]))
+        if end == len(words):
+            return chunks
+        start = end - overlap
+
+def _group(notes, max_tokens, count_tokens):
+    # Consecutive notes, at least two per group (so each round shrinks), within max_tokens where possible
+    groups, current, size = [], [], 0
+    for note in notes:
+        tokens = count_tokens(note)
+        if len(current) > 1 and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(note)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+@metrics.timed("summary.map")
+def _partial_notes(transcript, max_tokens, overlap_tokens):
+    """Map step, plus intermediate merges until the notes fit in one reduce prompt."""
+    service = get_service()
+    count_tokens = service.backend.count_tokens
+    chunks = chunk_transcript(transcript, max_tokens, overlap_tokens, count_tokens)
+    # Submitted together so the service runs them concurrently and in batches
+    notes = service.generate_many([
+        CHUNK_PROMPT_TEMPLATE.format(part=i + 1, parts=len(chunks), transcript=chunk)
+        for i, chunk in enumerate(chunks)
+    ])
+    while len(notes) > 1 and count_tokens("\n\n".join(notes)) > max_tokens:
+        notes = service.generate_many([
+            REDUCE_PROMPT_TEMPLATE.format(notes="\n\n".join(group))
+            for group in _group(notes, max_tokens, count_tokens)
+        ])
+    return notes
+
+def summarize_hierarchical(transcript, max_tokens=config.SUMMARY_CHUNK_TOKENS,
+                           overlap_tokens=config.SUMMARY_CHUNK_OVERLAP):
+    """
+    Map-reduce summary: overlapping token-bounded chunks are summarized in
+    parallel, then a reduce pass merges the partial notes into bulleted
+    meeting notes. Nothing past the model's context is dropped and each
+    prompt stays short, so cost grows linearly with transcript length.
+    """
+    notes = _partial_notes(transcript, max_tokens, overlap_tokens)
+    return get_service().generate(REDUCE_PROMPT_TEMPLATE.format(notes="\n\n".join(notes)))
+
+def _is_long(transcript):
+    return get_service().backend.count_tokens(transcript) > config.SUMMARY_CHUNK_TOKENS
+
+@metrics.timed("summary.summarize")
+def summarize(transcript):
+    """
+    Turn a transcript into bulleted markdown meeting notes with the configured
+    summarization backend. Transcripts over SUMMARY_CHUNK_TOKENS go through
+    summarize_hierarchical instead of being cut off by the model's context.
+    """
+    if _is_long(transcript):
+        metrics.inc("summary.hierarchical")
+        return summarize_hierarchical(transcript)
+    return get_service().generate(PROMPT_TEMPLATE.format(transcript=transcript))
 
-print(markdown_text)
+def summarize_stream(transcript):
+    """Like summarize, but yield the notes piece by piece as the model writes them (the reduce pass, for long ones)."""
+    if _is_long(transcript):
+        notes = _partial_notes(transcript, config.SUMMARY_CHUNK_TOKENS, config.SUMMARY_CHUNK_OVERLAP)
+        return get_service().stream(REDUCE_PROMPT_TEMPLATE.format(notes="\n\n".join(notes)))
+    return get_service().stream(PROMPT_TEMPLATE.format(transcript=transcript))
 
+if __name__ == "__main__":
+    pieces = []
+    for piece in summarize_stream(SAMPLE_TRANSCRIPT):
+        pieces.append(piece)
+        print(piece, end='', flush=True)
+    print()
+    markdown_text = "".join(pieces)
+    final_text = markdown_to_text(markdown_text)
@@ -0,0 +1,275 @@
+"""
+Opt-in process metrics: latency histograms per stage, counters, gauges.
+
+Off by default, so instrumented code pays one attribute check per call.
+Turn it on with NEURON_METRICS=1 (or metrics.enable()); with
+NEURON_METRICS_FILE=path the snapshot is also written when the process
+exits, as Prometheus text when the path ends in .prom/.txt and as JSON
+otherwise.
+
+    with metrics.timer("db.add_note"): ...
+    @metrics.timed("tagging.extract_tags")
+    metrics.inc("embedding.texts", len(texts))
+    metrics.register_collector(fn)   # fn() -> {name: value}, read at dump time
+    metrics.snapshot() / metrics.to_json() / metrics.to_prometheus()
+
+Sizes that are cheap to read on demand (store rows, cache hit rates, model
+load times) come from collectors instead of being updated on every call.
+For a single run, profile() wraps cProfile and optionally tracemalloc.
+"""
+import io
+import sys
+import json
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+import functools
+import tracemalloc
+import multiprocessing
+from contextlib import contextmanager
+
+import config
+
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus-style
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+           float("inf"))
+
+enabled = False
+_lock = threading.Lock()
+_histograms = {}   # name -> Histogram
+_counters = {}     # name -> number
+_collectors = []
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (the max for the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else 0.0,
+                "p50": self.quantile(0.5), "p90": self.quantile(0.9), "p99": self.quantile(0.99),
+                "max": self.max,
+                "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in zip(BUCKETS, self.counts)}}
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def observe(name, seconds):
+    if not enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name, value=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Context manager recording the block's wall time under name (a no-op while disabled)."""
+    return _Timer(name) if enabled else _NULL_TIMER
+
+
+def timed(name):
+    """Decorator form of timer()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def register_collector(collector):
+    """Add a zero-argument function returning {gauge name: number}, called at snapshot time."""
+    _collectors.append(collector)
+    return collector
+
+
+def _model_load_times():
+    import model_registry
+    return {f"model.load_seconds.{name}": seconds for name, seconds in model_registry.load_times.items()}
+
+register_collector(_model_load_times)
+
+
+def snapshot():
+    """{"latency": {name: summary}, "counters": {...}, "gauges": {...}}."""
+    gauges = {}
+    for collector in list(_collectors):
+        try:
+            gauges.update(collector())
+        except Exception:  # a broken collector must not take the dump down with it
+            gauges[f"collector_errors.{getattr(collector, '__name__', 'collector')}"] = 1
+    with _lock:
+        return {
+            "latency": {name: h.summary() for name, h in sorted(_histograms.items())},
+            "counters": dict(sorted(_counters.items())),
+            "gauges": dict(sorted(gauges.items())),
+        }
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _prom_name(name):
+    return "neuron_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus():
+    """Snapshot in the Prometheus text exposition format."""
+    snap = snapshot()
+    lines = []
+    for name, h in snap["latency"].items():
+        metric = _prom_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in h["buckets"].items():
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum {h['sum']}")
+        lines.append(f"{metric}_count {h['count']}")
+    for name, value in snap["counters"].items():
+        metric = _prom_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, value in snap["gauges"].items():
+        metric = _prom_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    """Write the snapshot to path: Prometheus text for .prom/.txt, JSON otherwise."""
+    text = to_prometheus() if path.endswith((".prom", ".txt")) else to_json()
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+@contextmanager
+def profile(path=None, memory=False, top=25):
+    """
+    Profile a block (e.g. one ingest run) with cProfile, and with memory=True
+    trace allocations with tracemalloc. Pipeline worker threads are covered:
+    on Python 3.12+ cProfile runs on sys.monitoring, which sees every thread
+    and allows one profiler, so a single one is used; before that, threads
+    started inside the block get a profiler each and the stats are merged.
+    Prints the top functions by cumulative time and the top
+    allocation sites; with path, the merged stats are saved there for
+    snakeviz/pstats.
+    """
+    profilers = [cProfile.Profile()]
+    per_thread = sys.version_info < (3, 12)
+
+    def profile_thread(*args):
+        thread_profiler = cProfile.Profile()
+        thread_profiler.enable()  # replaces this hook for the rest of the thread
+        profilers.append(thread_profiler)  # only once it is running
+
+    if memory:
+        tracemalloc.start()
+    if per_thread:
+        threading.setprofile(profile_thread)
+    profilers[0].enable()
+    try:
+        yield
+    finally:
+        profilers[0].disable()
+        if per_thread:
+            threading.setprofile(None)
+        out = io.StringIO()
+        stats = pstats.Stats(profilers[0], stream=out)
+        for thread_profiler in profilers[1:]:
+            thread_profiler.disable()
+            stats.add(thread_profiler)
+        stats.sort_stats("cumulative").print_stats(top)
+        print(out.getvalue())
+        if path:
+            stats.dump_stats(path)
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stats = tracemalloc.take_snapshot().statistics("lineno")
+            tracemalloc.stop()
+            print(f"Memory: {current / 2**20:.1f} MiB live, {peak / 2**20:.1f} MiB peak")
+            for stat in stats[:top]:
+                print(f"  {stat}")
+
+
+if config.METRICS or config.METRICS_FILE:
+    enable()
+# Only the main process dumps; pool workers would overwrite its file with their partial view
+if config.METRICS_FILE and multiprocessing.parent_process() is None:
+    atexit.register(dump, config.METRICS_FILE)
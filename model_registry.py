@@ -0,0 +1,77 @@
+"""
+Process-wide registry of heavy models (sentence embedder, spaCy, Whisper, ...).
+
+Modules register a loader at import time, which is cheap; the model itself is
+built on the first get() and shared afterwards. Loading is thread-safe: each
+name has its own lock, so concurrent callers wait for one load instead of
+racing, and different models can load in parallel.
+"""
+import time
+import threading
+
+import config
+
+
+_loaders = {}
+_models = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+# Seconds spent in each loader, for profiling startup
+load_times = {}
+
+
+def register(name, loader):
+    """Register a zero-argument loader. Re-registering drops any loaded instance."""
+    with _registry_lock:
+        _loaders[name] = loader
+        _locks.setdefault(name, threading.Lock())
+        _models.pop(name, None)
+
+
+def get(name):
+    model = _models.get(name)
+    if model is not None:
+        return model
+    if name not in _loaders:
+        raise KeyError(f"No model registered as '{name}'")
+
+    with _locks[name]:
+        model = _models.get(name)
+        if model is None:
+            start = time.perf_counter()
+            model = _loaders[name]()
+            load_times[name] = time.perf_counter() - start
+            _models[name] = model
+    return model
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def unload(name):
+    with _locks.get(name, _registry_lock):
+        _models.pop(name, None)
+
+
+def warm(names=None, background=True):
+    """
+    Load models ahead of first use. names defaults to config.WARM_MODELS;
+    unregistered names are skipped. With background=True the loads run on a
+    daemon thread, which is returned.
+    """
+    if names is None:
+        names = config.WARM_MODELS
+    names = [name for name in names if name in _loaders]
+
+    def load_all():
+        for name in names:
+            get(name)
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,306 @@
+import os
+import uuid
+import json
+import argparse
+import threading
+from bisect import bisect_right
+import numpy as np
+
+import config
+from journal import Journal, atomic_write_lines
+
+
+META_FILE = "meta.json"
+NOTES_FILE = "notes.jsonl"
+JOURNAL_FILE = "journal.jsonl"
+EMBEDDINGS_FILE = "embeddings.bin"
+
+
+class NoteStore:
+    """
+    Note storage inside one directory:
+
+    - notes.jsonl: snapshot with one JSON record per note (id, text, tags,
+      backlinks, ...), without the embedding. Line i describes row i.
+    - journal.jsonl: append-only log of notes inserted or updated since the
+      snapshot, one {"row": i, "note": {...}} record each, replayed on open.
+    - embeddings.bin: a contiguous row-major float32/float16 matrix, opened
+      through a read-only memory map so loading never parses vectors.
+
+    Inserts append one matrix row and one journal record; nothing is
+    rewritten. Once the journal holds compact_every records it is folded
+    into a new snapshot on a background thread.
+
+    Every extend/update_many bumps an in-memory version and logs the rows
+    it touched, so readers can ask what changed since a version they saw.
+    Versions restart with each open; epoch (random per open) tells a
+    reader its version belongs to an earlier session.
+    """
+
+    def __init__(self, path, dim=config.EMBEDDING_DIM, dtype=config.EMBEDDING_DTYPE,
+                 compact_every=config.JOURNAL_COMPACT_EVERY, fsync=config.JOURNAL_FSYNC):
+        self.path = path
+        self.compact_every = compact_every
+        self.fsync = fsync
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        else:
+            meta = {"dim": dim, "dtype": np.dtype(dtype).name}
+            atomic_write_lines(meta_path, [json.dumps(meta, indent=4)])
+
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        self.row_bytes = self.dim * self.dtype.itemsize
+
+        self.notes = []   # metadata records, index == matrix row
+        self._rows = {}   # note id -> row
+        self._matrix = None
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._change_versions = []  # version of each logged change, ascending
+        self._change_rows = []      # rows touched by that change
+        self._lock = threading.RLock()
+        self._compactor = None
+        self.journal = Journal(os.path.join(path, JOURNAL_FILE), fsync=fsync)
+        self._load()
+
+    @property
+    def notes_path(self):
+        return os.path.join(self.path, NOTES_FILE)
+
+    @property
+    def embeddings_path(self):
+        return os.path.join(self.path, EMBEDDINGS_FILE)
+
+    def _load(self):
+        if os.path.exists(self.notes_path):
+            with open(self.notes_path, "r") as f:
+                for line in f:
+                    self.notes.append(json.loads(line))
+
+        for record in self.journal.replay():
+            row = record["row"]
+            if row < len(self.notes):
+                self.notes[row] = record["note"]
+            elif row == len(self.notes):
+                self.notes.append(record["note"])
+
+        if not os.path.exists(self.embeddings_path):
+            open(self.embeddings_path, "wb").close()
+
+        # Rows are written before their record, so the records decide the count
+        rows = os.path.getsize(self.embeddings_path) // self.row_bytes
+        count = min(len(self.notes), rows)
+        self.notes = self.notes[:count]
+        if os.path.getsize(self.embeddings_path) != count * self.row_bytes:
+            with open(self.embeddings_path, "r+b") as f:
+                f.truncate(count * self.row_bytes)
+
+        self._rows = {note["id"]: i for i, note in enumerate(self.notes)}
+
+        # Fold a log left behind by an interrupted compaction
+        if self.journal.has_rotated():
+            self.compact()
+
+    def __len__(self):
+        return len(self.notes)
+
+    def __contains__(self, note_id):
+        return note_id in self._rows
+
+    @property
+    def embeddings(self):
+        """(N, dim) memory-mapped view of every embedding, in row order."""
+        if self._matrix is None or len(self._matrix) != len(self.notes):
+            if not self.notes:
+                self._matrix = np.empty((0, self.dim), dtype=self.dtype)
+            else:
+                self._matrix = np.memmap(self.embeddings_path, dtype=self.dtype, mode="r",
+                                         shape=(len(self.notes), self.dim))
+        return self._matrix
+
+    def row(self, note_id):
+        return self._rows[note_id]
+
+    def get(self, note_id, with_embedding=False):
+        note = dict(self.notes[self._rows[note_id]])
+        if with_embedding:
+            note["embedding"] = self.embeddings[self._rows[note_id]]
+        return note
+
+    def embedding(self, note_id):
+        return self.embeddings[self._rows[note_id]]
+
+    def iter_notes(self, with_embeddings=False):
+        matrix = self.embeddings if with_embeddings else None
+        for i, note in enumerate(self.notes):
+            note = dict(note)
+            if with_embeddings:
+                note["embedding"] = matrix[i]
+            yield note
+
+    def append(self, note, embedding):
+        self.extend([note], [embedding])
+
+    def extend(self, notes, embeddings):
+        """Append notes and their embeddings with one write per file."""
+        if not notes:
+            return
+        matrix = np.asarray(embeddings, dtype=self.dtype).reshape(len(notes), self.dim)
+        with self._lock:
+            records = []
+            ids = set()
+            for i, note in enumerate(notes):
+                if note["id"] in self._rows or note["id"] in ids:
+                    raise ValueError(f"Note '{note['id']}' already exists")
+                ids.add(note["id"])
+                note = {k: v for k, v in note.items() if k != "embedding"}
+                records.append({"row": len(self.notes) + i, "note": note})
+
+            with open(self.embeddings_path, "ab") as f:
+                f.write(matrix.tobytes())
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self.journal.append_many(records)
+
+            for record in records:
+                self._rows[record["note"]["id"]] = record["row"]
+                self.notes.append(record["note"])
+            self._log_change(records)
+            self._maybe_compact()
+
+    def update(self, note_id, **fields):
+        self.update_many({note_id: fields})
+
+    def update_many(self, changes):
+        """
+        Apply metadata changes ({note_id: {field: value}}), journaling one
+        record per changed note. Embeddings are immutable and never touched.
+        """
+        with self._lock:
+            records = []
+            for note_id, fields in changes.items():
+                row = self._rows[note_id]
+                fields = {k: v for k, v in fields.items() if k not in ("id", "embedding")}
+                # Replace rather than mutate so an in-flight snapshot stays consistent
+                note = dict(self.notes[row], **fields)
+                records.append({"row": row, "note": note})
+            self.journal.append_many(records)
+            for record in records:
+                self.notes[record["row"]] = record["note"]
+            self._log_change(records)
+            self._maybe_compact()
+
+    def _log_change(self, records):
+        if records:
+            self.version += 1
+            self._change_versions.append(self.version)
+            self._change_rows.append([record["row"] for record in records])
+
+    def changed_since(self, version):
+        """Rows inserted or updated after version, ascending."""
+        with self._lock:
+            start = bisect_right(self._change_versions, version)
+            rows = set()
+            for changed in self._change_rows[start:]:
+                rows.update(changed)
+        return sorted(rows)
+
+    def _maybe_compact(self):
+        if self.compact_every and self.journal.count >= self.compact_every:
+            if self._compactor is None or not self._compactor.is_alive():
+                self.compact(background=True)
+
+    def compact(self, background=False):
+        """
+        Fold the journal into a new snapshot. The live journal is rotated
+        under the lock, then the snapshot is written to a temp file and
+        atomically swapped in before the rotated segment is deleted.
+        """
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                self._compactor.join()
+            self.journal.rotate()
+            snapshot = list(self.notes)
+
+        def write_snapshot():
+            atomic_write_lines(self.notes_path, (json.dumps(note) + "\n" for note in snapshot))
+            self.journal.discard_rotated()
+
+        if background:
+            self._compactor = threading.Thread(target=write_snapshot, daemon=True)
+            self._compactor.start()
+        else:
+            write_snapshot()
+
+    def close(self):
+        """Wait for a running compaction and release the journal handle."""
+        with self._lock:
+            if self._compactor is not None:
+                self._compactor.join()
+                self._compactor = None
+            self.journal.close()
+
+
+def migrate_json(json_path=config.DB_FILE, store_path=config.STORE_DIR, dtype=config.EMBEDDING_DTYPE):
+    """One-shot import of a legacy db.json list into a binary NoteStore."""
+    with open(json_path, "r") as f:
+        legacy = json.load(f)
+
+    notes = [note for note in legacy if note.get("embedding")]
+    skipped = len(legacy) - len(notes)
+    dim = len(notes[0]["embedding"]) if notes else config.EMBEDDING_DIM
+
+    store = NoteStore(store_path, dim=dim, dtype=dtype)
+    new = [note for note in notes if note["id"] not in store]
+    store.extend(new, [note["embedding"] for note in new])
+    store.compact()
+
+    print(f"Migrated {len(new)} notes from '{json_path}' into '{store_path}'"
+          + (f" (skipped {skipped} without embeddings)" if skipped else ""))
+    return store
+
+
+def export_json(store, json_path=config.EXPORT_FILE, include_embeddings=False):
+    """
+    Write the store back out in the legacy db.json layout (a list of note
+    objects) for older scripts. Refuses to write over the migration source:
+    without embeddings it would no longer migrate.
+    """
+    if os.path.abspath(json_path) == os.path.abspath(config.DB_FILE):
+        raise ValueError(f"'{json_path}' is the migration source; export to another file")
+    data = []
+    for note in store.iter_notes(with_embeddings=include_embeddings):
+        if include_embeddings:
+            note["embedding"] = note["embedding"].astype(np.float32).tolist()
+        data.append(note)
+    with open(json_path, "w") as f:
+        json.dump(data, f, indent=4)
+    return json_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the binary note store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser("migrate", help="import a legacy db.json")
+    migrate.add_argument("json_path", nargs="?", default=config.DB_FILE)
+    migrate.add_argument("--store", default=config.STORE_DIR)
+    migrate.add_argument("--dtype", default=config.EMBEDDING_DTYPE, choices=["float32", "float16"])
+
+    export = sub.add_parser("export", help="write the store as a legacy db.json")
+    export.add_argument("json_path", nargs="?", default=config.EXPORT_FILE)
+    export.add_argument("--store", default=config.STORE_DIR)
+    export.add_argument("--with-embeddings", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_json(args.json_path, args.store, args.dtype)
+    else:
+        export_json(NoteStore(args.store), args.json_path, args.with_embeddings)
+        print(f"Exported store '{args.store}' to '{args.json_path}'")
@@ -0,0 +1,84 @@
+import sys
+
+import config
+import metrics
+from db import get_store, get_index, get_inverted_index
+from vector_embedding import generate_embedding
+
+
+@metrics.timed("search.semantic")
+def semantic_search(query, k=5, min_score=None):
+    """
+    Embed the query and return the k most similar notes, best first, each
+    with a "score" (cosine similarity) and without its embedding.
+    """
+    store = get_store()
+    matches = get_index().search(generate_embedding(query), k=k, min_score=min_score)
+    return [dict(store.get(note_id), score=score) for note_id, score in matches]
+
+
+@metrics.timed("search.hybrid")
+def hybrid_search(query, k=10, tags=(), any_tags=(), alpha=config.HYBRID_ALPHA,
+                  candidates=config.HYBRID_CANDIDATES, query_embedding=None):
+    """
+    Search notes by meaning and by wording at once.
+
+    Candidates are the top `candidates` notes by vector similarity plus the
+    top `candidates` by BM25 over the query words, restricted to notes with
+    every tag in `tags` and any tag in `any_tags`. Each candidate gets
+    score = alpha * cosine + (1 - alpha) * BM25 / best BM25, so both parts
+    lie in [0, 1]. Returns the top k notes (no embeddings) with "score",
+    "vector_score" and "keyword_score".
+    """
+    store = get_store()
+    index = get_index()
+    inverted = get_inverted_index()
+    if query_embedding is None:
+        query_embedding = generate_embedding(query)
+
+    allowed = inverted.match(all_tags=tags, any_tags=any_tags) if tags or any_tags else None
+    if allowed is not None and not allowed:
+        return []
+
+    # Vector candidates: score a small filtered set exactly, otherwise over-fetch and filter
+    if allowed is not None and len(allowed) <= config.HYBRID_EXACT_FILTER:
+        allowed_ids = [inverted.ids[doc] for doc in allowed]
+        sims = index.score(query_embedding, allowed_ids)
+        vector_scores = dict(sorted(zip(allowed_ids, sims.tolist()), key=lambda x: -x[1])[:candidates])
+    else:
+        fetch = candidates if allowed is None else candidates * 4
+        vector_scores = {note_id: score for note_id, score in index.search(query_embedding, k=fetch)
+                         if allowed is None or inverted.doc(note_id) in allowed}
+
+    # Keyword candidates
+    bm25 = inverted.bm25(query, docs=allowed)
+    top_keyword = sorted(bm25.items(), key=lambda x: -x[1])[:candidates]
+    keyword_scores = {inverted.ids[doc]: score for doc, score in top_keyword}
+
+    ids = list(dict.fromkeys(list(vector_scores) + list(keyword_scores)))
+    if not ids:
+        return []
+    missing = [note_id for note_id in ids if note_id not in vector_scores]
+    if missing:
+        vector_scores.update(zip(missing, index.score(query_embedding, missing).tolist()))
+    for note_id in ids:
+        if note_id not in keyword_scores:
+            keyword_scores[note_id] = bm25.get(inverted.doc(note_id), 0.0)
+
+    best_keyword = max(keyword_scores.values()) or 1.0
+    scored = []
+    for note_id in ids:
+        vector_score = max(vector_scores[note_id], 0.0)
+        keyword_score = keyword_scores[note_id] / best_keyword
+        scored.append((alpha * vector_score + (1 - alpha) * keyword_score, vector_score, keyword_score, note_id))
+    scored.sort(reverse=True)
+
+    return [dict(store.get(note_id), score=score, vector_score=vector_score, keyword_score=keyword_score)
+            for score, vector_score, keyword_score, note_id in scored[:k]]
+
+
+if __name__ == "__main__":
+    query = " ".join(sys.argv[1:]) or "arbitrage trading strategy"
+    for note in hybrid_search(query, k=5):
+        title = note["text"].strip().splitlines()[0]
+        print(f"{note['score']:.3f}  {note['id']}  {title}")
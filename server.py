@@ -0,0 +1,248 @@
+"""
+Local HTTP API over the note store, for force_graph.html and the Flutter app.
+
+One process keeps the embedding model, the vector index and the inverted
+index warm, so a search costs one query embedding plus index lookups rather
+than a model load and a db.json parse. Requests are served on a thread
+each; reads run concurrently and inserts take the store exclusively.
+
+    GET  /search?q=...&k=10&tag=a&tag=b&any_tag=c   hybrid search
+    GET  /notes?tag=...&term=...&prefix=...&page=0  filtered listing, newest first
+    GET  /notes/<id>                                 one note (no embedding)
+    GET  /graph                                      ids, tags and backlinks only
+    GET  /graph?since=<version>&epoch=<epoch>        changes since a version seen
+    POST /notes  {"text": ..., "tags": [...]?}       add a note
+    GET  /metrics                                    Prometheus text (NEURON_METRICS=1)
+    GET  /                                           force_graph.html
+
+Responses are JSON, gzipped when the client sends Accept-Encoding: gzip.
+
+    python server.py [--host 127.0.0.1] [--port 8000]
+"""
+import os
+import gzip
+import json
+import argparse
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import config
+import metrics
+import model_registry
+import db
+from search import hybrid_search
+
+
+GRAPH_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "force_graph.html")
+
+
+class ReadWriteLock:
+    """Many readers or one writer. Writers wait for readers in flight and block new ones."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+
+    def release_write(self):
+        with self._cond:
+            self._writing = False
+            self._cond.notify_all()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+_lock = ReadWriteLock()
+
+
+def _int_param(params, name, default, minimum=None):
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+    if minimum is not None and value < minimum:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be at least {minimum}")
+    return value
+
+
+def _route_name(path):
+    # A fixed set of names, so arbitrary request paths cannot grow the metrics without bound
+    first = path.strip("/").split("/")[0]
+    return first if first in ("search", "notes", "graph") else "other"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive between the viewer's requests
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        if path == "/":
+            with open(GRAPH_PAGE, "rb") as f:
+                return self._send(HTTPStatus.OK, f.read(), "text/html; charset=utf-8")
+        if path == "/metrics":
+            return self._send(HTTPStatus.OK, metrics.to_prometheus().encode(), "text/plain; version=0.0.4")
+        self._read(self._route_get, path, params)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path != "/notes":
+            return self._error(HTTPStatus.NOT_FOUND, f"no route for POST {path}")
+        try:
+            body = self._json_body()
+            text = body.get("text")
+            if not isinstance(text, str) or not text.strip():
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'text' must be a non-empty string")
+            tags = body.get("tags")
+            if tags is not None and not (isinstance(tags, list)
+                                         and all(isinstance(tag, str) and tag.strip() for tag in tags)):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'tags' must be a list of non-empty strings")
+        except HTTPError as e:
+            return self._error(e.status, str(e))
+
+        _lock.acquire_write()
+        try:
+            note_id = db.add_note(text, tags=tags)
+            note = db.get_store().get(note_id)
+        except Exception as e:
+            return self._internal_error(e)
+        finally:
+            _lock.release_write()
+        self._json(HTTPStatus.CREATED, note)
+
+    def _read(self, route, path, params):
+        _lock.acquire_read()
+        try:
+            with metrics.timer(f"server.get.{_route_name(path)}"):
+                status, payload = route(path, params)
+        except HTTPError as e:
+            return self._error(e.status, str(e))
+        except Exception as e:
+            return self._internal_error(e)
+        finally:
+            _lock.release_read()
+        self._json(status, payload)
+
+    def _route_get(self, path, params):
+        store = db.get_store()
+        if path == "/search":
+            query = params.get("q", [""])[0]
+            if not query.strip():
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'q' is required")
+            results = hybrid_search(query, k=_int_param(params, "k", 10, minimum=1),
+                                    tags=params.get("tag", []), any_tags=params.get("any_tag", []))
+            return HTTPStatus.OK, {"query": query, "results": results}
+        if path == "/notes":
+            total, notes = db.query_notes(params.get("tag", []), params.get("any_tag", []),
+                                          params.get("term", []), params.get("prefix", [None])[0],
+                                          page=_int_param(params, "page", 0, minimum=0),
+                                          page_size=_int_param(params, "page_size", 20, minimum=1))
+            return HTTPStatus.OK, {"total": total, "notes": notes}
+        if path.startswith("/notes/"):
+            note_id = unquote(path[len("/notes/"):])
+            if note_id not in store:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"no note '{note_id}'")
+            return HTTPStatus.OK, store.get(note_id)
+        if path == "/graph":
+            if "since" in params:
+                return HTTPStatus.OK, db.graph_delta(_int_param(params, "since", 0, minimum=0),
+                                                     params.get("epoch", [None])[0])
+            return HTTPStatus.OK, db.graph_export()
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for GET {path}")
+
+    def _json_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        return body
+
+    def _error(self, status, message):
+        self._json(status, {"error": message})
+
+    def _internal_error(self, error):
+        # Answer instead of letting the handler thread die with the connection open
+        self.log_error("%s %s failed: %r", self.command, self.path, error)
+        self._error(HTTPStatus.INTERNAL_SERVER_ERROR, f"internal error: {error!r}")
+
+    def _json(self, status, payload):
+        self._send(status, json.dumps(payload, separators=(",", ":")).encode(), "application/json")
+
+    def _send(self, status, body, content_type):
+        gzipped = (len(body) >= config.SERVER_GZIP_MIN_BYTES
+                   and "gzip" in self.headers.get("Accept-Encoding", ""))
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def warm_up(background=True):
+    """Load the models and build the indexes before the first request needs them."""
+    models = model_registry.warm(["embedding", "spacy"], background=background)
+    db.get_index()
+    db.get_inverted_index()
+    db.get_term_stats()
+    return models
+
+
+def make_server(host=config.SERVER_HOST, port=config.SERVER_PORT):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve search, notes and the backlink graph over HTTP.")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    args = parser.parse_args()
+
+    warm_up()
+    server = make_server(args.host, args.port)
+    print(f"Serving {len(db.get_store())} notes on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db.close()
@@ -0,0 +1,356 @@
+"""
+Summarization service: one loaded model behind a request queue.
+
+A backend (Ollama, transformers, or an offline stub) is built once per
+process through model_registry and shared. Callers submit prompts from any
+thread; at most `concurrency` worker threads talk to the backend, and a
+worker that finds several plain requests waiting hands them to the backend
+as one batch when it can batch. Streaming requests get their text pieces
+back as the model produces them.
+
+    service = get_service()
+    future = service.submit(prompt)           # concurrent.futures.Future
+    text = service.generate(prompt)           # blocking
+    for piece in service.stream(prompt): ...  # tokens as generated
+"""
+import re
+import math
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+import config
+import metrics
+import model_registry
+
+
+class SummaryBackend:
+    """
+    A text generator. generate() takes a batch of prompts and returns one
+    text each; stream() yields the pieces of one generation. max_batch is
+    the largest batch generate() should be given. count_tokens() sizes
+    input chunks; backends without a local tokenizer estimate it.
+    """
+
+    max_batch = 1
+
+    def count_tokens(self, text):
+        # Llama-family tokenizers average about 1.3 tokens per English word
+        return int(len(text.split()) * 1.3) + 1
+
+    def generate(self, prompts):
+        return ["".join(self.stream(prompt)) for prompt in prompts]
+
+    def stream(self, prompt):
+        raise NotImplementedError
+
+
+class OllamaBackend(SummaryBackend):
+    """A model served by a local Ollama daemon, which does its own batching, so requests go one at a time."""
+
+    def __init__(self, model=config.SUMMARY_MODEL, host=config.OLLAMA_HOST, options=None):
+        from ollama import Client
+        self.model = model
+        self.client = Client(host=host)
+        self.options = options
+
+    def generate(self, prompts):
+        return [self.client.generate(model=self.model, prompt=prompt, options=self.options)["response"]
+                for prompt in prompts]
+
+    def stream(self, prompt):
+        for chunk in self.client.generate(model=self.model, prompt=prompt, options=self.options, stream=True):
+            yield chunk["response"]
+
+
+class TransformersBackend(SummaryBackend):
+    """An instruction-tuned Hugging Face model in-process; prompts go in as the user turn of a chat."""
+
+    def __init__(self, model_id=config.SUMMARY_HF_MODEL, system_prompt=None,
+                 max_new_tokens=config.SUMMARY_MAX_TOKENS, batch_size=config.SUMMARY_BATCH_SIZE):
+        import torch
+        from transformers import pipeline
+        self.pipe = pipeline("text-generation", model=model_id, torch_dtype=torch.bfloat16, device_map="auto")
+        tokenizer = self.pipe.tokenizer
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token_id = tokenizer.eos_token_id
+        tokenizer.padding_side = "left"  # decoder-only models continue from the right edge
+        self.system_prompt = system_prompt
+        self.max_new_tokens = max_new_tokens
+        self.max_batch = batch_size
+
+    def count_tokens(self, text):
+        return len(self.pipe.tokenizer.encode(text, add_special_tokens=False))
+
+    def _messages(self, prompt):
+        system = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        return system + [{"role": "user", "content": prompt}]
+
+    def generate(self, prompts):
+        outputs = self.pipe([self._messages(prompt) for prompt in prompts], batch_size=len(prompts),
+                            max_new_tokens=self.max_new_tokens, return_full_text=False)
+        return [output[0]["generated_text"] for output in outputs]
+
+    def stream(self, prompt):
+        from transformers import TextIteratorStreamer
+        streamer = TextIteratorStreamer(self.pipe.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def run():
+            try:
+                self.pipe(self._messages(prompt), max_new_tokens=self.max_new_tokens, streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                # A failed generation never ends the stream itself; without this the reader waits forever
+                streamer.end()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        yield from streamer
+        thread.join()
+        if errors:
+            raise errors[0]
+
+
+class StubBackend(SummaryBackend):
+    """
+    Offline stand-in for tests and benchmarks: an extractive summary (at
+    least `sentences`, or `ratio` of the sentences after the prompt's
+    instructions, picked to cover their distinctive words) as bullets,
+    streamed word by word. token_delay seconds per output word and prefill_delay per prompt
+    token mimic generation speed; a batch costs as long as its longest
+    member. With context_tokens, words past that budget are dropped the way
+    a model's context window truncates them.
+    """
+
+    max_batch = 8
+
+    def __init__(self, sentences=5, ratio=0.1, token_delay=0.0, prefill_delay=0.0, context_tokens=None):
+        self.sentences = sentences
+        self.ratio = ratio
+        self.token_delay = token_delay
+        self.prefill_delay = prefill_delay
+        self.context_tokens = context_tokens
+
+    def _visible(self, prompt):
+        if self.context_tokens is None:
+            return prompt
+        words = prompt.split(" ")
+        return " ".join(words[:int(self.context_tokens / 1.3)])
+
+    @staticmethod
+    def _content(prompt):
+        # Prompts are instructions, then a "Transcript:"-style line, then the text to summarize
+        return re.split(r":[ \t]*\n", prompt, maxsplit=1)[-1]
+
+    @staticmethod
+    def _words(text):
+        return re.findall(r"[a-z']+", text.lower())
+
+    def summarize(self, prompt):
+        sentences = []
+        for sentence in re.split(r"(?<=[.!?])\s+|\n+", self._content(self._visible(prompt))):
+            words = sentence.split()
+            # Unpunctuated speech comes out as one run-on "sentence"; cut it into clauses
+            for start in range(0, len(words), 25):
+                if len(words[start:start + 25]) > 3:
+                    sentences.append(" ".join(words[start:start + 25]))
+        bags = [set(word for word in self._words(sentence) if len(word) > 3) for sentence in sentences]
+
+        # Words weighted by how rare they are across sentences (filler appears everywhere);
+        # a word stops counting once a chosen sentence covers it, so picks spread over topics
+        n = len(sentences)
+        spread = Counter(word for bag in bags for word in bag)
+        weight = {word: math.log(n / count) for word, count in spread.items()}
+        keep = []
+        for _ in range(min(n, max(self.sentences, round(n * self.ratio)))):
+            best = max((i for i in range(n) if i not in keep),
+                       key=lambda i: sum(weight[word] for word in bags[i]) / (1 + len(bags[i])) ** 0.5)
+            keep.append(best)
+            for word in bags[best]:
+                weight[word] = 0.0
+        return "\n".join(f"- {sentences[i]}" for i in sorted(keep))
+
+    def _prefill(self, prompts):
+        if self.prefill_delay and prompts:
+            time.sleep(self.prefill_delay * max(self.count_tokens(self._visible(p)) for p in prompts))
+
+    def generate(self, prompts):
+        self._prefill(prompts)
+        summaries = [self.summarize(prompt) for prompt in prompts]
+        if self.token_delay and summaries:
+            time.sleep(self.token_delay * max(len(summary.split()) for summary in summaries))
+        return summaries
+
+    def stream(self, prompt):
+        self._prefill([prompt])
+        for i, word in enumerate(self.summarize(prompt).split(" ")):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+BACKENDS = {
+    "ollama": OllamaBackend,
+    "transformers": TransformersBackend,
+    "stub": StubBackend,
+}
+
+
+def make_backend(name=config.SUMMARY_BACKEND, **params):
+    try:
+        return BACKENDS[name](**params)
+    except KeyError:
+        raise ValueError(f"Unknown summarization backend '{name}', expected one of {sorted(BACKENDS)}")
+
+
+_STOP = object()
+_END = object()
+
+
+class _Request:
+    __slots__ = ("prompt", "future", "tokens", "queued")
+
+    def __init__(self, prompt, tokens=None):
+        self.prompt = prompt
+        self.future = Future()
+        self.tokens = tokens  # queue of streamed pieces, or None for a plain request
+        self.queued = time.perf_counter()
+
+
+class SummaryService:
+    """
+    Queue in front of one backend. `concurrency` worker threads bound how
+    many generations run at once (the rest wait in the queue, so a long
+    summary holds one worker rather than the caller's pipeline). A worker
+    takes up to batch_size plain requests that are already waiting as one
+    generate() call; streaming requests run on their own.
+    """
+
+    def __init__(self, backend, concurrency=config.SUMMARY_CONCURRENCY, batch_size=config.SUMMARY_BATCH_SIZE):
+        self.backend = backend
+        self.batch_size = max(1, min(batch_size, backend.max_batch))
+        self.stats = {"requests": 0, "batches": 0, "streams": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._workers = [threading.Thread(target=self._work, name=f"summarizer-{i}", daemon=True)
+                         for i in range(max(1, concurrency))]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, prompt):
+        """Queue a prompt; returns a Future for the generated text."""
+        request = _Request(prompt)
+        self._queue.put(request)
+        return request.future
+
+    def generate(self, prompt, timeout=None):
+        return self.submit(prompt).result(timeout)
+
+    def generate_many(self, prompts, timeout=None):
+        """Queue every prompt at once (so they can share batches) and wait for all, in order."""
+        futures = [self.submit(prompt) for prompt in prompts]
+        return [future.result(timeout) for future in futures]
+
+    def stream(self, prompt):
+        """Yield text pieces as the backend produces them; backend errors are raised at the end."""
+        request = _Request(prompt, tokens=queue.Queue())
+        self._queue.put(request)
+        while True:
+            piece = request.tokens.get()
+            if piece is _END:
+                break
+            yield piece
+        request.future.result()
+
+    def _work(self):
+        held = None
+        while True:
+            request, held = held or self._queue.get(), None
+            if request is _STOP:
+                return
+            if request.tokens is not None:
+                self._run_stream(request)
+                continue
+            batch = [request]
+            while len(batch) < self.batch_size:
+                try:
+                    waiting = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if waiting is _STOP or waiting.tokens is not None:
+                    held = waiting
+                    break
+                batch.append(waiting)
+            self._run_batch(batch)
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def _run_batch(self, batch):
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self._count(requests=len(batch), batches=1)
+        started = time.perf_counter()
+        for request in batch:
+            metrics.observe("summary.queue_wait", started - request.queued)
+        try:
+            with metrics.timer("summary.batch"):
+                outputs = self.backend.generate([request.prompt for request in batch])
+        except Exception as e:
+            self._count(errors=1)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, output in zip(batch, outputs):
+            request.future.set_result(output)
+
+    def _run_stream(self, request):
+        request.future.set_running_or_notify_cancel()
+        self._count(requests=1, streams=1)
+        started = time.perf_counter()
+        metrics.observe("summary.queue_wait", started - request.queued)
+        pieces = []
+        try:
+            for piece in self.backend.stream(request.prompt):
+                if not pieces:
+                    metrics.observe("summary.first_token", time.perf_counter() - started)
+                pieces.append(piece)
+                request.tokens.put(piece)
+        except Exception as e:
+            self._count(errors=1)
+            request.future.set_exception(e)
+        else:
+            metrics.observe("summary.stream", time.perf_counter() - started)
+            request.future.set_result("".join(pieces))
+        finally:
+            request.tokens.put(_END)
+
+    def close(self):
+        """Let queued requests finish, then stop the workers."""
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+
+
+model_registry.register("summarizer", lambda: SummaryService(make_backend()))
+
+def get_service():
+    return model_registry.get("summarizer")
+
+
+@metrics.register_collector
+def _service_stats():
+    if not model_registry.is_loaded("summarizer"):
+        return {}
+    service = get_service()
+    with service._stats_lock:
+        stats = {f"summary.{name}": value for name, value in service.stats.items()}
+    stats["summary.queued"] = service._queue.qsize()
+    return stats
@@ -1,64 +1,236 @@
-from datasets import load_dataset
-from transformers import AutoTokenizer, AutoModelForCausalLM, TrainingArguments, Trainer
+"""
+Fine-tune Llama 3.2 1B Instruct on transcript -> summary pairs.
 
-# Load the dataset (using JSON; your training file should be in JSONL format)
-dataset = load_dataset("json", data_files={"train": "training_data.json"})
+Training data pipeline:
+- Each example becomes prompt + summary + EOS for the causal LM. Prompt
+  tokens are masked out of the loss (label -100), so the model only learns
+  to write the summary.
+- Examples are batched with others of similar length (group_by_length) and
+  padded only to the longest in their batch, not to a fixed 1024 tokens.
+- With --pack, short examples are concatenated into sequences of up to
+  --max-length tokens. Position ids restart for each example.
+- Gradient accumulation reaches --effective-batch-size from small
+  per-step batches.
+- The tokenized dataset is cached on disk, keyed by the data file, the
+  tokenizer and the settings, so later runs skip tokenization.
+- Throughput is reported as real (non-pad) tokens/sec plus the share of
+  each batch lost to padding.
+
+    python summaryTrainer.py [--data training_data.json] [--pack] [--batch-size 4 --effective-batch-size 32]
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+
+import torch
+from datasets import load_dataset, load_from_disk
+from transformers import AutoTokenizer, AutoModelForCausalLM, TrainingArguments, Trainer, TrainerCallback
 
 # Use the Llama 3.2 1B Instruct checkpoint; this requires trust_remote_code to be enabled.
 model_checkpoint = "meta-llama/Llama-3.2-1B-Instruct"
-tokenizer = AutoTokenizer.from_pretrained(model_checkpoint, trust_remote_code=True)
 
-# Print out one example to verify the dataset structure.
-print("Original Example:", dataset["train"][0])
+SYSTEM_PROMPT = (
+    "Summarize the transcript below using structured bullet points. "
+    "Focus only on key ideas and technical details:\n"
+)
+
+# Bump when the tokenization below changes, so stale caches are not reused
+PIPELINE_VERSION = 1
+
+
+def tokenize_examples(examples, tokenizer, max_prompt_tokens=1024, max_summary_tokens=128):
+    """prompt + transcript, then summary + EOS; loss only on the summary part."""
+    prompts = tokenizer([SYSTEM_PROMPT + txt for txt in examples["text"]],
+                        max_length=max_prompt_tokens, truncation=True)["input_ids"]
+    summaries = tokenizer(examples["summary"], max_length=max_summary_tokens, truncation=True,
+                          add_special_tokens=False)["input_ids"]
+    input_ids, labels = [], []
+    for prompt, summary in zip(prompts, summaries):
+        summary = summary + [tokenizer.eos_token_id]
+        input_ids.append(prompt + summary)
+        labels.append([-100] * len(prompt) + summary)
+    return {"input_ids": input_ids, "labels": labels,
+            "position_ids": [list(range(len(ids))) for ids in input_ids],
+            "length": [len(ids) for ids in input_ids]}
+
+
+def pack_examples(examples, max_length=1024):
+    """
+    Greedily concatenate consecutive examples into sequences of at most
+    max_length tokens. Position ids restart at each example, but plain
+    attention still lets packed examples see each other; that is the usual
+    trade of packing for throughput.
+    """
+    packed = {"input_ids": [], "labels": [], "position_ids": [], "length": []}
+    current = {"input_ids": [], "labels": [], "position_ids": []}
+
+    def flush():
+        if current["input_ids"]:
+            for key in current:
+                packed[key].append(current[key])
+            packed["length"].append(len(current["input_ids"]))
+
+    for ids, labels, positions in zip(examples["input_ids"], examples["labels"], examples["position_ids"]):
+        if current["input_ids"] and len(current["input_ids"]) + len(ids) > max_length:
+            flush()
+            current = {"input_ids": [], "labels": [], "position_ids": []}
+        current["input_ids"] += ids
+        current["labels"] += labels
+        current["position_ids"] += positions
+    flush()
+    return packed
+
+
+def cache_key(data_file, args):
+    digest = hashlib.sha256()
+    with open(data_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    settings = [model_checkpoint, PIPELINE_VERSION, args.max_prompt_tokens, args.max_summary_tokens,
+                args.pack, args.max_length]
+    digest.update(json.dumps(settings).encode())
+    return digest.hexdigest()[:16]
+
+
+def load_tokenized(args, tokenizer):
+    """Tokenized (and optionally packed) training set, from the disk cache when it is current."""
+    cache_path = os.path.join(args.cache_dir, cache_key(args.data, args))
+    if os.path.exists(cache_path):
+        print(f"Loading tokenized dataset from {cache_path}")
+        return load_from_disk(cache_path)
+
+    dataset = load_dataset("json", data_files={"train": args.data})["train"]
+    print("Original Example:", dataset[0])
+    start = time.perf_counter()
+    tokenized = dataset.map(tokenize_examples, batched=True, remove_columns=dataset.column_names,
+                            fn_kwargs=dict(tokenizer=tokenizer, max_prompt_tokens=args.max_prompt_tokens,
+                                           max_summary_tokens=args.max_summary_tokens))
+    if args.pack:
+        # Sort by length first so packs fill evenly; one map call sees the whole set
+        tokenized = tokenized.sort("length").map(pack_examples, batched=True, batch_size=len(tokenized),
+                                                 fn_kwargs=dict(max_length=args.max_length))
+    print(f"Tokenized {len(dataset)} examples into {len(tokenized)} sequences "
+          f"in {time.perf_counter() - start:.1f}s")
+    tokenized.save_to_disk(cache_path)
+    return tokenized
+
+
+class DynamicPaddingCollator:
+    """
+    Pad a batch only to its longest sequence (rounded up to a multiple of
+    pad_to_multiple_of). Labels pad with -100 so padding adds no loss. Real
+    and padded token counts are kept for the throughput report.
+    """
 
-# Preprocessing function to add the system prompt to the "text" field.
-def preprocess_function(examples):
-    system_prompt = (
-        "Summarize the transcript below using structured bullet points. "
-        "Focus only on key ideas and technical details:\n"
+    def __init__(self, pad_token_id, pad_to_multiple_of=8):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def __call__(self, features):
+        longest = max(len(f["input_ids"]) for f in features)
+        if self.pad_to_multiple_of:
+            longest = -(-longest // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        def pad(key, value):
+            return torch.tensor([f[key] + [value] * (longest - len(f[key])) for f in features])
+
+        batch = {
+            "input_ids": pad("input_ids", self.pad_token_id),
+            "labels": pad("labels", -100),
+            "position_ids": pad("position_ids", 0),
+            "attention_mask": torch.tensor([[1] * len(f["input_ids"]) + [0] * (longest - len(f["input_ids"]))
+                                            for f in features]),
+        }
+        self.real_tokens += int(batch["attention_mask"].sum())
+        self.padded_tokens += batch["attention_mask"].numel()
+        return batch
+
+
+class ThroughputCallback(TrainerCallback):
+    """Log real tokens/sec and the padding share alongside the loss."""
+
+    def __init__(self, collator):
+        self.collator = collator
+        self.start = None
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.start = time.perf_counter()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        real, padded = self.collator.real_tokens, self.collator.padded_tokens
+        return {"tokens_per_sec": real / elapsed if elapsed else 0.0,
+                "padding_share": 1 - real / padded if padded else 0.0,
+                "real_tokens": real}
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if logs is not None and self.start is not None:
+            logs.update(self.report())
+
+    def on_train_end(self, args, state, control, **kwargs):
+        stats = self.report()
+        print(f"Trained on {stats['real_tokens']} tokens at {stats['tokens_per_sec']:.1f} tokens/sec "
+              f"({stats['padding_share']:.1%} of batch positions were padding)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune the summarizer on transcript/summary pairs.")
+    parser.add_argument("--data", default="training_data.json", help="JSON lines with 'text' and 'summary'")
+    parser.add_argument("--output-dir", default="./llama3.2-finetuned-cpu")
+    parser.add_argument("--cache-dir", default="./tokenized_cache")
+    parser.add_argument("--max-prompt-tokens", type=int, default=1024)
+    parser.add_argument("--max-summary-tokens", type=int, default=128)
+    parser.add_argument("--pack", action="store_true", help="concatenate short examples up to --max-length")
+    parser.add_argument("--max-length", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=4, help="sequences per step")
+    parser.add_argument("--effective-batch-size", type=int, default=32, help="sequences per optimizer update")
+    parser.add_argument("--epochs", type=float, default=3)
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 mixed precision (recent CPUs and GPUs)")
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(model_checkpoint, trust_remote_code=True)
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    train_dataset = load_tokenized(args, tokenizer)
+
+    training_args = TrainingArguments(
+        output_dir=args.output_dir,
+        eval_strategy="no",   # Not using an eval set here
+        learning_rate=2e-5,
+        per_device_train_batch_size=args.batch_size,
+        gradient_accumulation_steps=max(1, args.effective_batch_size // args.batch_size),
+        group_by_length=not args.pack,  # bucket by the "length" column; packed sequences are already even
+        length_column_name="length",
+        remove_unused_columns=False,  # the collator needs position_ids and drops "length" itself
+        num_train_epochs=args.epochs,
+        weight_decay=0.01,
+        logging_steps=10,
+        save_total_limit=2,
+        bf16=args.bf16,
+        fp16=False,  # Mixed precision via fp16 is disabled on CPU
     )
-    # Prepend the prompt to each transcript.
-    input_texts = [system_prompt + txt for txt in examples["text"]]
-    inputs = tokenizer(input_texts, max_length=1024, truncation=True)
-    # Tokenize the target summaries.
-    targets = tokenizer(examples["summary"], max_length=128, truncation=True)
-    labels = targets.input_ids
-    # Replace pad token id's with -100 so loss is not computed on padding.
-    labels = [[(token if token != tokenizer.pad_token_id else -100) for token in label] for label in labels]
-    inputs["labels"] = labels
-    return inputs
-
-# Map the preprocessing function over the dataset (batched processing for speed).
-tokenized_dataset = dataset.map(preprocess_function, batched=True)
-
-# Set up training arguments. (Note: For CPU training, set per_device_train_batch_size=1.)
-training_args = TrainingArguments(
-    output_dir="./llama3.2-finetuned-cpu",
-    eval_strategy="no",   # Not using an eval set here
-    learning_rate=2e-5,
-    per_device_train_batch_size=1,  # Small batch size for CPU limitations
-    num_train_epochs=3,
-    weight_decay=0.01,
-    logging_steps=100,
-    save_total_limit=2,
-    fp16=False  # Mixed precision is disabled on CPU
-)
 
-# Load the pre-trained Llama 3.2 model using the causal LM class.
-model = AutoModelForCausalLM.from_pretrained(model_checkpoint, trust_remote_code=True)
+    # Load the pre-trained Llama 3.2 model using the causal LM class.
+    model = AutoModelForCausalLM.from_pretrained(model_checkpoint, trust_remote_code=True)
 
-# Initialize the Trainer. (We're using tokenized_dataset["train"] as the training data.)
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=tokenized_dataset["train"]
-)
+    collator = DynamicPaddingCollator(tokenizer.pad_token_id)
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        data_collator=collator,
+        callbacks=[ThroughputCallback(collator)],
+    )
 
-# Start fine-tuning.
-trainer.train()
+    # Start fine-tuning.
+    trainer.train()
 
-# Save the fine-tuned model and tokenizer.
-trainer.save_model("./llama3.2-finetuned-cpu")
-tokenizer.save_pretrained("./llama3.2-finetuned-cpu")
+    # Save the fine-tuned model and tokenizer.
+    trainer.save_model(args.output_dir)
+    tokenizer.save_pretrained(args.output_dir)
 
-print("Fine-tuning complete and model saved.")
+    print("Fine-tuning complete and model saved.")
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+import math
+import threading
+
+import config
+from journal import Journal, atomic_write_lines
+
+
+STATS_FILE = "term_stats.json"
+STATS_JOURNAL_FILE = "term_stats.jsonl"
+
+# Common English function words; they carry no topic and would bloat every posting list
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over
+own same she should so some such than that the their theirs them themselves then there these they
+this those through to too under until up very was we were what when where which while who whom
+why will with would you your yours yourself yourselves
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Lower-cased word terms of a text, stop words removed, in order (with repeats)."""
+    return [t for t in _WORD.findall(text.lower()) if t not in STOP_WORDS and len(t) > 1]
+
+
+class DocumentFrequencies:
+    """
+    Number of notes containing each term, kept up to date one note at a time
+    so IDF lookups never rescan the corpus.
+
+    Persisted like the note store: a snapshot (term_stats.json) plus an
+    append-only journal of per-note term sets, folded into the snapshot
+    every compact_every notes. Records carry a sequence number and the
+    snapshot remembers the last one applied, so replay never counts a note
+    twice.
+    """
+
+    def __init__(self, path=None, compact_every=config.JOURNAL_COMPACT_EVERY, fsync=config.JOURNAL_FSYNC):
+        self.path = path
+        self.compact_every = compact_every
+        self.n_docs = 0
+        self.df = {}
+        self.seq = 0
+        self._lock = threading.RLock()
+        self._compactor = None
+        self.journal = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self.journal = Journal(os.path.join(path, STATS_JOURNAL_FILE), fsync=fsync)
+            self._load()
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.path, STATS_FILE)
+
+    def _load(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            self.n_docs, self.df, self.seq = snapshot["n_docs"], snapshot["df"], snapshot["seq"]
+        for record in self.journal.replay():
+            if record["seq"] > self.seq:
+                self._apply(record["terms"])
+                self.seq = record["seq"]
+        if self.journal.has_rotated():
+            self.compact()
+
+    def _apply(self, terms):
+        self.n_docs += 1
+        for term in terms:
+            self.df[term] = self.df.get(term, 0) + 1
+
+    def add_document(self, terms):
+        self.add_documents([terms])
+
+    def add_documents(self, term_lists):
+        """Count one note per entry; each entry is that note's terms (repeats are ignored)."""
+        with self._lock:
+            records = []
+            for terms in term_lists:
+                terms = sorted(set(terms))
+                self.seq += 1
+                self._apply(terms)
+                records.append({"seq": self.seq, "terms": terms})
+            if self.journal is not None:
+                self.journal.append_many(records)
+                if self.compact_every and self.journal.count >= self.compact_every:
+                    if self._compactor is None or not self._compactor.is_alive():
+                        self.compact(background=True)
+
+    def idf(self, term):
+        """Smoothed inverse document frequency; 1.0 for every term on an empty corpus."""
+        return math.log((1 + self.n_docs) / (1 + self.df.get(term, 0))) + 1
+
+    def compact(self, background=False):
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                self._compactor.join()
+            self.journal.rotate()
+            snapshot = {"n_docs": self.n_docs, "seq": self.seq, "df": dict(self.df)}
+
+        def write_snapshot():
+            atomic_write_lines(self.snapshot_path, [json.dumps(snapshot)])
+            self.journal.discard_rotated()
+
+        if background:
+            self._compactor = threading.Thread(target=write_snapshot, daemon=True)
+            self._compactor.start()
+        else:
+            write_snapshot()
+
+    def close(self):
+        with self._lock:
+            if self._compactor is not None:
+                self._compactor.join()
+                self._compactor = None
+            if self.journal is not None:
+                self.journal.close()
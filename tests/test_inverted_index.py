@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inverted_index import InvertedIndex
+
+
+def test_mixed_case_tags_are_found_by_every_filter():
+    index = InvertedIndex()
+    index.add("a", "some text", ["Roadmap", " Q2 Planning "])
+    index.add("b", "other text", ["budget"])
+
+    assert index.query(all_tags=["Roadmap"])[1] == ["a"]
+    assert index.query(all_tags=["roadmap", "q2 planning"])[1] == ["a"]
+    assert index.query(any_tags=["ROADMAP", "missing"])[1] == ["a"]
+    assert index.query(prefix="Road")[1] == ["a"]
+    assert index.query(prefix="q2")[1] == ["a"]
+
+
+def test_set_tags_moves_mixed_case_postings():
+    index = InvertedIndex()
+    index.add("a", "some text", ["Roadmap", "Q2 Planning"])
+    index.set_tags("a", ["Roadmap", "Q2 Planning"], ["roadmap", "Launch"])
+
+    assert index.query(all_tags=["Roadmap", "launch"])[1] == ["a"]
+    assert index.query(all_tags=["q2 planning"])[0] == 0
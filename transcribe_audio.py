@@ -1,33 +1,263 @@
-import whisper
-from jiwer import wer, cer, compute_measures, Compose, RemovePunctuation, ToLowerCase, Strip, RemoveMultipleSpaces
-import string
-import time 
-
-# Load Whisper model
-start = time.time()
-model = whisper.load_model("tiny")  # or "tiny", "small", "medium", etc.
-
-# Transcribe audio
-transcribed_result = model.transcribe("audio-meeting.mp3")
-transcribed_text = transcribed_result["text"].strip()
-end = time.time()
-transcription_duration = end - start
-# # Actual ground truth text
-# ground_truth_text = "I need your arms around me I need to feel your touch Hey Baby Im tired of waiting Go re-charge your batteries Come back to me and make your mama proud I need your arms around me I need to feel your touch And I really want to talk"
-
-# # Compute detailed measures
-# measures = compute_measures(
-#     ground_truth_text,
-#     transcribed_text,
-    
-# )
-
-# # Display results
-# print("Ground Truth:\n", ground_truth_text)
-print("Transcription:\n", transcribed_text)
-print("Transcription Duration:", transcription_duration, "seconds")
-# print("\n--- Evaluation Metrics ---")
-# print(f"WER (Word Error Rate): {measures['wer']:.2%}")
-# print(f"Insertions: {measures['insertions']}")
-# print(f"Deletions: {measures['deletions']}")
-# print(f"Substitutions: {measures['substitutions']}")
+import time
+import os
+import argparse
+import subprocess
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+import config
+import metrics
+import model_registry
+
+
+SAMPLE_RATE = 16000  # Whisper's input rate
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac", ".ogg", ".webm")
+
+
+# Load Whisper model on first use
+def _load_model():
+    import whisper
+    return whisper.load_model(config.WHISPER_MODEL)  # or "tiny", "small", "medium", etc.
+
+model_registry.register("whisper", _load_model)
+
+def get_model():
+    return model_registry.get("whisper")
+
+def transcribe(audio_path):
+    """Transcribe a whole audio file and return the stripped text."""
+    model = get_model()
+    with metrics.timer("transcribe.file"):
+        transcribed_result = model.transcribe(audio_path)
+    return transcribed_result["text"].strip()
+
+def audio_duration(audio_path):
+    """Length of an audio file in seconds, read from the container via ffprobe."""
+    out = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                          "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+def stream_audio(audio_path, window_s=30.0, overlap_s=5.0):
+    """
+    Decode audio with ffmpeg as it is read and yield (offset_s, samples,
+    is_last) windows of window_s seconds, each starting overlap_s before
+    the previous one ends. Only about one window of samples is held in
+    memory, whatever the recording length.
+    """
+    window = int(window_s * SAMPLE_RATE)
+    overlap = int(overlap_s * SAMPLE_RATE)
+    hop = window - overlap
+    if hop <= 0:
+        raise ValueError("overlap_s must be shorter than window_s")
+
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-i", audio_path,
+           "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def windows():
+        buffer = np.empty(0, dtype=np.float32)
+        offset = 0
+        try:
+            while True:
+                chunk = proc.stdout.read(hop * 2)
+                if chunk:
+                    pcm = np.frombuffer(chunk[:len(chunk) // 2 * 2], dtype=np.int16)
+                    buffer = np.concatenate([buffer, pcm.astype(np.float32) / 32768.0])
+                while len(buffer) >= window:
+                    yield offset, buffer[:window]
+                    buffer = buffer[hop:]
+                    offset += hop
+                if not chunk:
+                    break
+            # Tail: anything not already covered by the previous window's overlap
+            if len(buffer) > (overlap if offset else 0):
+                yield offset, buffer
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+    # One window of lookahead so the caller knows which window is last
+    previous = None
+    for current in windows():
+        if previous is not None:
+            yield previous[0] / SAMPLE_RATE, previous[1], False
+        previous = current
+    if previous is not None:
+        yield previous[0] / SAMPLE_RATE, previous[1], True
+
+def transcribe_stream(audio_path, window_s=30.0, overlap_s=5.0, **options):
+    """
+    Transcribe incrementally, yielding {"start", "end", "text"} segments
+    (absolute seconds) as each window finishes.
+
+    Windows overlap by overlap_s; each boundary is cut at the middle of the
+    overlap, so a segment is kept only from the window in which it starts
+    on the near side of that cut. Words split by a window edge are thereby
+    taken from the window that heard them whole. The tail of the previous
+    window's text is passed as the prompt to keep wording consistent.
+    """
+    model = get_model()
+    hop_s = window_s - overlap_s
+    prompt = None
+    for offset, samples, is_last in stream_audio(audio_path, window_s, overlap_s):
+        with metrics.timer("transcribe.window"):
+            result = model.transcribe(samples, initial_prompt=prompt, **options)
+        low = offset + overlap_s / 2 if offset > 0 else 0.0
+        high = float("inf") if is_last else offset + hop_s + overlap_s / 2
+        kept = []
+        for segment in result["segments"]:
+            start = offset + segment["start"]
+            if low <= start < high and segment["text"].strip():
+                end = min(offset + segment["end"], offset + len(samples) / SAMPLE_RATE)
+                kept.append({"start": round(float(start), 2), "end": round(float(end), 2),
+                             "text": segment["text"].strip()})
+        for segment in kept:
+            yield segment
+        if kept:
+            prompt = " ".join(s["text"] for s in kept)[-200:]
+
+def find_audio_files(paths):
+    """Expand directories (non-recursively) into the audio files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+@contextmanager
+def _child_thread_env(threads):
+    """
+    Set the BLAS/OpenMP thread caps in this process's environment while
+    workers are spawned. Spawned children inherit it and read it when numpy
+    and torch first load, at import of this module, before any initializer
+    runs; setting it inside the worker would be too late.
+    """
+    saved = {var: os.environ.get(var) for var in THREAD_VARS}
+    os.environ.update({var: str(threads) for var in THREAD_VARS})
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+def _init_worker(threads):
+    # BLAS pools were sized from the inherited environment; torch's intra-op pool can still be set here
+    import torch
+    torch.set_num_threads(threads)
+    get_model()  # once per worker, reused for every file it handles
+
+def _transcribe_file(audio_path):
+    start = time.perf_counter()
+    try:
+        text = transcribe(audio_path)
+        duration = audio_duration(audio_path)
+    except Exception as e:
+        # One unreadable file must not take the rest of the batch down
+        return {"path": audio_path, "error": repr(e)}
+    return {
+        "path": audio_path,
+        "text": text,
+        "seconds": time.perf_counter() - start,
+        "audio_seconds": duration,
+    }
+
+def transcribe_many(paths, workers=None, threads_per_worker=None):
+    """
+    Transcribe files or directories of audio in a process pool, yielding one
+    {"path", "text", "seconds", "audio_seconds"} result per file as each
+    finishes, or {"path", "error"} for a file that failed. Each worker
+    loads Whisper once; cores are split evenly between workers unless
+    threads_per_worker is given.
+    """
+    files = find_audio_files(paths)
+    if not files:
+        return
+    cores = os.cpu_count() or 1
+    workers = workers or min(len(files), max(1, cores // 2))
+    threads_per_worker = threads_per_worker or max(1, cores // workers)
+
+    # spawn: fresh interpreters, so nothing torch-related is inherited across fork
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(threads_per_worker,)) as pool:
+        # Workers start on submit, so they all inherit the capped environment
+        with _child_thread_env(threads_per_worker):
+            futures = {pool.submit(_transcribe_file, path): path for path in files}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:  # the worker itself died (e.g. BrokenProcessPool)
+                yield {"path": futures[future], "error": repr(e)}
+
+def batch_main(paths, workers=None, threads_per_worker=None):
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    count = 0
+    failed = []
+    for result in transcribe_many(paths, workers, threads_per_worker):
+        if "error" in result:
+            failed.append(result["path"])
+            print(f"{result['path']}: FAILED ({result['error']})")
+            continue
+        count += 1
+        audio_seconds += result["audio_seconds"]
+        # Workers are separate processes; their timings come back with the results
+        metrics.observe("transcribe.file", result["seconds"])
+        metrics.inc("transcribe.audio_seconds", result["audio_seconds"])
+        print(f"{result['path']}: {result['seconds']:.1f}s for {result['audio_seconds']:.1f}s of audio")
+    wall = time.perf_counter() - start
+    if count:
+        print(f"{count} files, {audio_seconds:.1f}s of audio in {wall:.1f}s "
+              f"({audio_seconds / wall:.2f} audio-seconds per wall-second)")
+    if failed:
+        print(f"{len(failed)} file(s) failed: {', '.join(failed)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe audio with Whisper.")
+    parser.add_argument("paths", nargs="*", help="audio files or directories (batch mode)")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads-per-worker", type=int)
+    args = parser.parse_args()
+    if args.paths:
+        batch_main(args.paths, args.workers, args.threads_per_worker)
+        raise SystemExit
+
+    # Load separately so the model load is not counted as transcription time
+    get_model()
+    start = time.perf_counter()
+
+    # Transcribe audio
+    transcribed_text = transcribe("audio-meeting.mp3")
+    transcription_duration = time.perf_counter() - start
+    # # Actual ground truth text
+    # ground_truth_text = "I need your arms around me I need to feel your touch Hey Baby Im tired of waiting Go re-charge your batteries Come back to me and make your mama proud I need your arms around me I need to feel your touch And I really want to talk"
+
+    # # Compute detailed measures (evaluation only: pip install "jiwer<4")
+    # from jiwer import compute_measures
+    # measures = compute_measures(
+    #     ground_truth_text,
+    #     transcribed_text,
+        
+    # )
+
+    # # Display results
+    # print("Ground Truth:\n", ground_truth_text)
+    print("Transcription:\n", transcribed_text)
+    print("Model Load:", model_registry.load_times["whisper"], "seconds")
+    print("Transcription Duration:", transcription_duration, "seconds")
+    # print("\n--- Evaluation Metrics ---")
+    # print(f"WER (Word Error Rate): {measures['wer']:.2%}")
+    # print(f"Insertions: {measures['insertions']}")
+    # print(f"Deletions: {measures['deletions']}")
+    # print(f"Substitutions: {measures['substitutions']}")
@@ -1,9 +1,68 @@
 # Step 1: Import necessary libraries
-from sentence_transformers import SentenceTransformer, util
 import numpy as np
 
+import config
+import metrics
+import model_registry
+from embedding_cache import EmbeddingCache
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+
+def _load_model():
+    # Imported here: sentence_transformers pulls in torch, which alone costs seconds
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(config.EMBEDDING_MODEL)
+
+model_registry.register("embedding", _load_model)
+_cache = None
+
+def get_model():
+    return model_registry.get("embedding")
+
+def get_cache():
+    """Embedding cache, opened on first use; None when disabled in config."""
+    global _cache
+    if _cache is None and config.EMBEDDING_CACHE:
+        _cache = EmbeddingCache(config.EMBEDDING_MODEL)
+    return _cache
+
+@metrics.timed("embedding.generate")
+def generate_embeddings(texts, batch_size=config.EMBEDDING_BATCH_SIZE, normalize=True):
+    """
+    Embed many texts with batched SentenceTransformer.encode calls. Texts
+    already in the embedding cache are not re-encoded.
+
+    Args:
+        texts (list[str]): The input texts to be embedded.
+        batch_size (int): Texts per forward pass.
+        normalize (bool): Scale each vector to unit length.
+
+    Returns:
+        np.ndarray: float32 matrix of shape (len(texts), dim).
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, config.EMBEDDING_DIM), dtype=np.float32)
+    metrics.inc("embedding.texts", len(texts))
+
+    cache = get_cache()
+    if cache is None:
+        return _encode(texts, batch_size, normalize)
+
+    cached = cache.get_many(texts, normalize)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+    if missing:
+        encoded = _encode(missing, batch_size, normalize)
+        cache.put_many(missing, encoded, normalize)
+        fresh = dict(zip(missing, encoded))
+        cached = [fresh[t] if v is None else v for t, v in zip(texts, cached)]
+    return np.stack(cached).astype(np.float32, copy=False)
+
+@metrics.timed("embedding.encode")
+def _encode(texts, batch_size, normalize):
+    metrics.inc("embedding.encoded", len(texts))
+    embeddings = get_model().encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                    normalize_embeddings=normalize, show_progress_bar=False)
+    return embeddings.astype(np.float32, copy=False)
 
 def generate_embedding(text, normalize=True):
     """
@@ -15,30 +74,10 @@ def generate_embedding(text, normalize=True):
     Returns:
         np.ndarray: The generated embedding vector.
     """
-    
-    # # Step 3: Define the summary text (this should be the output of your summarization model)
-    # summary_text = (
-    # """ Meeting Summary: Google Maps API Integration
-
-    # Overview:
-    # Discussion focused on integrating Google Maps API for location-based business search and routing.
-
-    # Key Concepts:
-    # - Enabled proper billing and permissions for API functionality.
-    # - Users can now search for nearby businesses and get visual routes.
-
-    # Next Steps:
-    # - Customize map markers with branded icons.
-    # - Implement filters for categories (e.g., restaurants, stores).
-    # """
-    # )
-
-    embedding = model.encode(text, convert_to_tensor=True)
-
-    embedding_normalized = embedding / np.linalg.norm(embedding)
-
-    # Step 5: Output the results
-    print("Embedding vector shape:", embedding.shape)
-    print("Normalized embedding (first 5 values):", embedding_normalized[:5])
+    return generate_embeddings([text], batch_size=1, normalize=normalize)[0]
 
-    return embedding.tolist()
+@metrics.register_collector
+def _cache_stats():
+    if _cache is None:
+        return {}
+    return {f"embedding_cache.{name}": value for name, value in _cache.stats().items()}
@@ -0,0 +1,567 @@
+import heapq
+import math
+import warnings
+import numpy as np
+
+import config
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _grow(array, used, new, order="C"):
+    """Write rows after the first `used`, growing capacity geometrically so appends stay amortized."""
+    needed = used + len(new)
+    if needed > len(array):
+        grown = np.empty((max(needed, 2 * len(array), 64),) + array.shape[1:], dtype=array.dtype, order=order)
+        grown[:used] = array[:used]
+        array = grown
+    array[used:needed] = new
+    return array
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over note embeddings. Vectors are normalized on
+    insert, so scores are dot products in [-1, 1].
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.ids = []
+        self._positions = {}
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, note_id):
+        return note_id in self._positions
+
+    @property
+    def vectors(self):
+        return self._vectors[:len(self.ids)]
+
+    def vector(self, note_id):
+        """Normalized vector stored for note_id."""
+        return self._vectors[self._positions[note_id]]
+
+    def score(self, query_embedding, ids):
+        """Exact cosine similarity of the query to each of ids."""
+        query = _normalize(query_embedding).reshape(self.dim)
+        return self._vectors[[self._positions[i] for i in ids]] @ query
+
+    def memory_bytes(self):
+        """RAM held by the stored vectors (or their codes)."""
+        return self.vectors.nbytes
+
+    def _append_vectors(self, vectors):
+        self._vectors = _grow(self._vectors, len(self.ids), vectors)
+
+    def add(self, ids, vectors):
+        vectors = _normalize(vectors).reshape(len(ids), self.dim)
+        for note_id in ids:
+            if note_id in self._positions:
+                raise ValueError(f"'{note_id}' is already indexed")
+        start = len(self.ids)
+        self._append_vectors(vectors)
+        for i, note_id in enumerate(ids):
+            self._positions[note_id] = start + i
+            self.ids.append(note_id)
+        self._on_add(range(start, start + len(ids)))
+
+    def _on_add(self, positions):
+        pass
+
+    def search(self, query_embedding, k=10, min_score=None, exclude=None):
+        """
+        Return up to k (note_id, score) pairs, best first, with score >=
+        min_score. Ids in exclude (e.g. the query note itself) are skipped.
+        """
+        raise NotImplementedError
+
+    def _finish(self, positions, scores, k, min_score, exclude):
+        results = []
+        for pos, score in sorted(zip(positions, scores), key=lambda x: -x[1]):
+            if min_score is not None and score < min_score:
+                break
+            note_id = self.ids[pos]
+            if exclude and note_id in exclude:
+                continue
+            results.append((note_id, float(score)))
+            if len(results) >= k:
+                break
+        return results
+
+
+class BruteForceIndex(VectorIndex):
+    """Exact search: one matrix-vector product over every stored vector."""
+
+    def search(self, query_embedding, k=10, min_score=None, exclude=None):
+        if not self.ids or k <= 0:
+            return []
+        query = _normalize(query_embedding).reshape(self.dim)
+        scores = self.vectors @ query
+        want = min(len(scores), k + len(exclude or ()))
+        top = np.argpartition(-scores, want - 1)[:want]
+        return self._finish(top, scores[top], k, min_score, exclude)
+
+
+class HNSWIndex(VectorIndex):
+    """
+    Approximate search with a Hierarchical Navigable Small World graph
+    (Malkov & Yashunin). Each vector gets a random top layer; search descends
+    greedily from the entry point and runs a beam of width ef on layer 0.
+
+    M bounds the out-degree per layer (2*M on layer 0), ef_construction the
+    beam used while linking new nodes and ef_search the beam at query time.
+
+    Experimental. The graph is built in pure Python and never persisted, so
+    every process that opens the index rebuilds it: about 90 s for 20k
+    notes, roughly 10 minutes for 100k. Queries are not clearly faster than
+    BruteForceIndex's single matrix product at these sizes. Recall depends
+    on the data: 1.0 on clustered embeddings but 0.4-0.8 on isotropic ones
+    at ef_search 64-256, which means missed backlinks. Use "brute", "ivf"
+    for faster approximate search, or "int8"/"pq" to save memory.
+    """
+
+    def __init__(self, dim, M=16, ef_construction=100, ef_search=64, seed=0):
+        super().__init__(dim)
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1 / math.log(M)
+        self._rng = np.random.default_rng(seed)
+        self._layers = []     # layer -> {node: [neighbor, ...]}
+        self._entry = None
+
+    def _max_degree(self, layer):
+        return 2 * self.M if layer == 0 else self.M
+
+    def _similarities(self, query, nodes):
+        return self._vectors[nodes] @ query
+
+    def _search_layer(self, query, entry_points, ef, layer):
+        graph = self._layers[layer]
+        visited = set(entry_points)
+        sims = self._similarities(query, entry_points)
+        candidates = [(-s, n) for s, n in zip(sims.tolist(), entry_points)]   # max-heap by similarity
+        best = [(s, n) for s, n in zip(sims.tolist(), entry_points)]          # min-heap of the ef best
+        heapq.heapify(candidates)
+        heapq.heapify(best)
+        while len(best) > ef:
+            heapq.heappop(best)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if -neg_sim < best[0][0] and len(best) >= ef:
+                break
+            fresh = [n for n in graph.get(node, ()) if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for sim, n in zip(self._similarities(query, fresh).tolist(), fresh):
+                if len(best) < ef or sim > best[0][0]:
+                    heapq.heappush(candidates, (-sim, n))
+                    heapq.heappush(best, (sim, n))
+                    if len(best) > ef:
+                        heapq.heappop(best)
+        return sorted(best, reverse=True)
+
+    def _select_neighbors(self, candidates, m):
+        """
+        Keep a candidate only if it is closer to the base node than to every
+        neighbor already kept, which spreads links across clusters.
+        """
+        if len(candidates) <= m:
+            return [n for _, n in candidates]
+        nodes = [n for _, n in candidates]
+        vectors = self._vectors[nodes]
+        pairwise = (vectors @ vectors.T).tolist()
+
+        selected = []
+        for i, (sim, _) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            row = pairwise[i]
+            if all(row[j] <= sim for j in selected):
+                selected.append(i)
+        if len(selected) < m:
+            # Top up with the nearest pruned candidates so degree doesn't collapse
+            kept = set(selected)
+            selected += [i for i in range(len(nodes)) if i not in kept][:m - len(selected)]
+        return [nodes[i] for i in selected]
+
+    def _on_add(self, positions):
+        for node in positions:
+            self._insert(node)
+
+    def _insert(self, node):
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        while len(self._layers) <= level:
+            self._layers.append({})
+        for layer in range(level + 1):
+            self._layers[layer][node] = []
+
+        if self._entry is None:
+            self._entry = node
+            return
+
+        query = self._vectors[node]
+        entry_points = [self._entry]
+        top = self._node_level(self._entry)
+        for layer in range(top, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        for layer in range(min(level, top), -1, -1):
+            candidates = self._search_layer(query, entry_points, self.ef_construction, layer)
+            neighbors = self._select_neighbors(candidates, self.M)
+            graph = self._layers[layer]
+            graph[node] = neighbors
+            max_degree = self._max_degree(layer)
+            for n in neighbors:
+                links = graph[n]
+                links.append(node)
+                if len(links) > max_degree:
+                    sims = self._vectors[links] @ self._vectors[n]
+                    ranked = sorted(zip(sims.tolist(), links), reverse=True)
+                    graph[n] = self._select_neighbors(ranked, max_degree)
+            entry_points = [n for _, n in candidates]
+
+        if level > top:
+            self._entry = node
+
+    def _node_level(self, node):
+        level = 0
+        while level + 1 < len(self._layers) and node in self._layers[level + 1]:
+            level += 1
+        return level
+
+    def search(self, query_embedding, k=10, min_score=None, exclude=None):
+        if self._entry is None or k <= 0:
+            return []
+        query = _normalize(query_embedding).reshape(self.dim)
+        entry_points = [self._entry]
+        for layer in range(self._node_level(self._entry), 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        ef = max(self.ef_search, k + len(exclude or ()))
+        found = self._search_layer(query, entry_points, ef, 0)
+        return self._finish([n for _, n in found], [s for s, _ in found], k, min_score, exclude)
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file search: every vector is filed under its nearest k-means
+    centroid, and a query scores only the lists of its nprobe nearest
+    centroids, exactly, from the stored floats.
+
+    nlist centroids (default 8*sqrt(n), so lists average sqrt(n)/8
+    vectors) are trained on 16 sampled vectors each once train_size vectors
+    have been added, and retrained whenever the index has grown 4x since;
+    until then search is brute force. Too few centroids or samples merge
+    topics into a few huge lists, which costs both speed and recall. Notes
+    on a topic land in the same few lists, so a small nprobe keeps recall@10
+    near 1 on clustered embeddings; raise it for more uniform data.
+    """
+
+    def __init__(self, dim, nprobe=config.IVF_NPROBE, nlist=None, train_size=4096, seed=0):
+        super().__init__(dim)
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.train_size = max(train_size, 1)
+        self.seed = seed
+        self.centroids = None
+        self._half_norms = None
+        self._lists = []     # centroid -> positions filed under it
+        self._trained_on = 0
+
+    def memory_bytes(self):
+        if self.centroids is None:
+            return self.vectors.nbytes
+        return self.vectors.nbytes + self.centroids.nbytes + sum(p.nbytes for p in self._lists)
+
+    def train(self):
+        """Fit centroids on the stored vectors and refile every position."""
+        vectors = self.vectors
+        nlist = self.nlist or max(1, int(8 * math.sqrt(len(vectors))))
+        self.centroids = kmeans(vectors, nlist, iterations=5, sample=16 * nlist, seed=self.seed)
+        self._half_norms = 0.5 * (self.centroids ** 2).sum(axis=1)
+        labels = assign_clusters(vectors, self.centroids)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(1, len(self.centroids)))
+        self._lists = np.split(order.astype(np.int64), bounds)
+        self._trained_on = len(vectors)
+
+    def _on_add(self, positions):
+        n = len(self.ids)
+        if n < self.train_size:
+            return
+        if self.centroids is None or n >= 4 * self._trained_on:
+            self.train()
+            return
+        positions = np.arange(positions.start, positions.stop)
+        labels = assign_clusters(self._vectors[positions], self.centroids)
+        for label in np.unique(labels):
+            self._lists[label] = np.concatenate([self._lists[label], positions[labels == label]])
+
+    def search(self, query_embedding, k=10, min_score=None, exclude=None):
+        if not self.ids or k <= 0:
+            return []
+        query = _normalize(query_embedding).reshape(self.dim)
+        if self.centroids is None:
+            candidates = np.arange(len(self.ids))
+            scores = self.vectors @ query
+        else:
+            # Same nearest-centroid rule the lists were filed with
+            nearness = self.centroids @ query - self._half_norms
+            probe = min(self.nprobe, len(nearness))
+            nearest = np.argpartition(-nearness, probe - 1)[:probe]
+            candidates = np.concatenate([self._lists[c] for c in nearest])
+            scores = self._vectors[candidates] @ query
+        want = min(len(scores), k + len(exclude or ()))
+        if want == 0:
+            return []
+        top = np.argpartition(-scores, want - 1)[:want]
+        return self._finish(candidates[top], scores[top], k, min_score, exclude)
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    Exhaustive search over compressed vectors. Only the codes stay in RAM:
+    a query scores every code approximately, then re-scores the best
+    rerank * k exactly from the float embeddings in `store` (the NoteStore
+    memory map, so floats live in the page cache rather than the heap).
+    Without a store the approximate scores are returned.
+    """
+
+    def __init__(self, dim, store=None, rerank=config.INDEX_RERANK, chunk=2048):
+        super().__init__(dim)
+        self._vectors = None
+        self.store = store
+        self.rerank = rerank
+        self.chunk = chunk
+
+    @property
+    def vectors(self):
+        return self._float(np.arange(len(self.ids)))
+
+    def vector(self, note_id):
+        return self._float([self._positions[note_id]])[0]
+
+    def score(self, query_embedding, ids):
+        query = _normalize(query_embedding).reshape(self.dim)
+        return self._float([self._positions[i] for i in ids]) @ query
+
+    def _float(self, positions):
+        """Normalized vectors at positions: exact from the store, else decoded from the codes."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.store is not None:
+            rows = [self.store.row(self.ids[p]) for p in positions]
+            return _normalize(self.store.embeddings[rows])
+        return self._decode(positions)
+
+    def add(self, ids, vectors):
+        # Normalize and encode a chunk at a time so a bulk build never holds a float copy
+        ids = list(ids)
+        for start in range(0, len(ids), self.chunk):
+            super().add(ids[start:start + self.chunk], vectors[start:start + self.chunk])
+
+    def search(self, query_embedding, k=10, min_score=None, exclude=None):
+        if not self.ids or k <= 0:
+            return []
+        query = _normalize(query_embedding).reshape(self.dim)
+        approx = self._approx_scores(query)
+        want = min(len(approx), (k + len(exclude or ())) * max(self.rerank, 1))
+        top = np.argpartition(-approx, want - 1)[:want]
+        scores = self._float(top) @ query if self.store is not None else approx[top]
+        return self._finish(top, scores, k, min_score, exclude)
+
+    def _approx_scores(self, query):
+        raise NotImplementedError
+
+    def _decode(self, positions):
+        raise NotImplementedError
+
+
+class Int8Index(QuantizedIndex):
+    """
+    Scalar quantization: each component is stored as an int8 step of the
+    vector's own scale (largest magnitude / 127), 4x smaller than float32.
+    """
+
+    def __init__(self, dim, store=None, rerank=config.INDEX_RERANK, chunk=2048):
+        super().__init__(dim, store, rerank, chunk)
+        self._codes = np.empty((0, dim), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+
+    def memory_bytes(self):
+        n = len(self.ids)
+        return self._codes[:n].nbytes + self._scales[:n].nbytes
+
+    def _append_vectors(self, vectors):
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        self._codes = _grow(self._codes, len(self.ids), codes)
+        self._scales = _grow(self._scales, len(self.ids), scales.astype(np.float32))
+
+    def _approx_scores(self, query):
+        n = len(self.ids)
+        scores = np.empty(n, dtype=np.float32)
+        # Small chunks keep the float32 copy in cache, which makes this about as fast as float32 search
+        for start in range(0, n, self.chunk):
+            end = min(start + self.chunk, n)
+            scores[start:end] = self._codes[start:end].astype(np.float32) @ query
+        return scores * self._scales[:n]
+
+    def _decode(self, positions):
+        return _normalize(self._codes[positions] * self._scales[positions, None])
+
+
+class PQIndex(QuantizedIndex):
+    """
+    Product quantization (Jegou et al.): a vector is cut into `subspaces`
+    slices and each slice is stored as the byte id of its nearest of 256
+    k-means centroids, so a 384-d vector takes `subspaces` bytes. Queries
+    score codes through one lookup table per slice.
+
+    Codebooks are trained once train_size vectors have been added; until
+    then vectors are kept as floats and searched exactly. Later vectors are
+    encoded with the same codebooks. PQ scores are coarse, so more
+    candidates are re-ranked than for int8.
+    """
+
+    def __init__(self, dim, store=None, rerank=config.PQ_RERANK, chunk=2048,
+                 subspaces=config.PQ_SUBSPACES, train_size=4096, seed=0):
+        if dim % subspaces:
+            raise ValueError(f"dim {dim} is not divisible into {subspaces} subspaces")
+        super().__init__(dim, store, rerank, chunk)
+        self.subspaces = subspaces
+        self.sub_dim = dim // subspaces
+        self.train_size = max(train_size, 256)
+        self.seed = seed
+        self.codebooks = None  # (subspaces, 256, sub_dim)
+        self._pending = np.empty((0, dim), dtype=np.float32)
+        self._codes = np.empty((0, subspaces), dtype=np.uint8, order="F")  # column per subspace
+
+    def memory_bytes(self):
+        n = len(self.ids)
+        if self.codebooks is None:
+            return self._pending[:n].nbytes
+        return self._codes[:n].nbytes + self.codebooks.nbytes
+
+    def train(self, vectors):
+        """Fit one codebook per subspace on vectors (normalized, in index order) and encode them."""
+        slices = vectors.reshape(len(vectors), self.subspaces, self.sub_dim)
+        self.codebooks = np.stack([kmeans(slices[:, j], 256, seed=self.seed + j)
+                                   for j in range(self.subspaces)])
+        self._codes = self._encode(vectors)
+        self._pending = np.empty((0, self.dim), dtype=np.float32)
+
+    def _encode(self, vectors):
+        slices = vectors.reshape(len(vectors), self.subspaces, self.sub_dim)
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8, order="F")
+        for j in range(self.subspaces):
+            codes[:, j] = assign_clusters(slices[:, j], self.codebooks[j])
+        return codes
+
+    def _append_vectors(self, vectors):
+        if self.codebooks is not None:
+            self._codes = _grow(self._codes, len(self.ids), self._encode(vectors), order="F")
+            return
+        self._pending = _grow(self._pending, len(self.ids), vectors)
+        needed = len(self.ids) + len(vectors)
+        if needed >= self.train_size:
+            self.train(self._pending[:needed])
+
+    def _approx_scores(self, query):
+        n = len(self.ids)
+        if self.codebooks is None:
+            return self._pending[:n] @ query
+        # table[j, c] = dot(query slice j, centroid c of subspace j)
+        table = np.einsum("jcd,jd->jc", self.codebooks, query.reshape(self.subspaces, self.sub_dim))
+        scores = np.zeros(n, dtype=np.float32)
+        for j in range(self.subspaces):
+            scores += table[j][self._codes[:n, j]]  # contiguous column, one gather per subspace
+        return scores
+
+    def _decode(self, positions):
+        if self.codebooks is None:
+            return self._pending[positions]
+        codes = self._codes[positions]
+        return _normalize(self.codebooks[np.arange(self.subspaces), codes].reshape(len(codes), self.dim))
+
+
+def assign_clusters(vectors, centroids, chunk=8192):
+    """Index of the nearest centroid (Euclidean) for every row, computed in chunks."""
+    centroids = np.asarray(centroids, dtype=np.float32)
+    half_norms = 0.5 * (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+        # argmin |x - c|^2 == argmax x.c - |c|^2 / 2
+        labels[start:start + chunk] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return labels
+
+
+def kmeans(vectors, k, iterations=10, sample=20000, seed=0):
+    """
+    Lloyd's k-means, trained on at most `sample` random rows. Returns the
+    (k, dim) centroids; empty clusters are reseeded from random rows.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    k = min(k, n)
+    rows = np.sort(rng.choice(n, size=min(n, sample), replace=False)) if sample and n > sample else np.arange(n)
+    data = np.asarray(vectors[rows], dtype=np.float32)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_clusters(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+    return centroids
+
+
+INDEX_TYPES = {
+    "brute": BruteForceIndex,
+    "hnsw": HNSWIndex,
+    "int8": Int8Index,
+    "ivf": IVFIndex,
+    "pq": PQIndex,
+}
+
+
+def make_index(kind, dim, **params):
+    """
+    Create an empty index by name: "brute" (exact, the default), "ivf"
+    (approximate, probes the nearest k-means lists), "hnsw" (experimental
+    graph, see HNSWIndex; warns), "int8" or "pq" (quantized, re-ranked from
+    floats).
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}', expected one of {sorted(INDEX_TYPES)}")
+    if kind == "hnsw":
+        warnings.warn('the "hnsw" index is rebuilt in pure Python on every start, is not faster than "brute" '
+                      'and can miss neighbours; use "brute", or "ivf" for approximate search', RuntimeWarning,
+                      stacklevel=2)
+    return INDEX_TYPES[kind](dim, **params)
+
+
+def build_index(store, kind, **params):
+    """Index every embedding in a NoteStore, in row order. Quantized indexes re-rank from the store."""
+    if kind in INDEX_TYPES and issubclass(INDEX_TYPES[kind], QuantizedIndex):
+        params.setdefault("store", store)
+    index = make_index(kind, store.dim, **params)
+    ids = [note["id"] for note in store.notes]
+    if ids:
+        index.add(ids, store.embeddings)
+    return index